@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'job-market-gov'))
+from flatten import flatten_list_column
+
+FIELDS = ['LocationName', 'CountrySubDivisionCode', 'Longitude']
+
+
+def reference_flatten(df, key, list_col, fields):
+    # explode + json_normalize with the exploded frame re-indexed so both sides line up
+    exploded = df[[key, list_col]].explode(list_col).reset_index(drop=True)
+    normalized = pd.json_normalize([v if isinstance(v, dict) else {} for v in exploded[list_col]])
+    return pd.concat([exploded[[key]], normalized.reindex(columns=fields)], axis=1)
+
+
+def make_parents(rows, max_children, rng):
+    # Random nesting: empty and missing lists, missing keys and a shuffled, duplicated index
+    lists = []
+    for i in range(rows):
+        kind = rng.random()
+        if kind < 0.05:
+            lists.append(None)
+        elif kind < 0.1:
+            lists.append([])
+        else:
+            lists.append([{field: f'{field}-{i}-{j}' if field != 'Longitude' else float(j)
+                           for field in FIELDS if rng.random() > 0.1}
+                          for j in range(rng.integers(1, max_children + 1))])
+    index = rng.permutation(rows) // 2
+    return pd.DataFrame({'PositionID': [f'P-{i}' for i in range(rows)], 'PositionLocation': lists}, index=index)
+
+
+def same_frame(a, b):
+    a = a.astype(object).where(a.notna(), None).reset_index(drop=True)
+    b = b.astype(object).where(b.notna(), None).reset_index(drop=True)
+    return a.equals(b)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time the positional nested list flattening against explode + json_normalize.")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of parent rows timed (default is 10000)")
+    parser.add_argument("--max_children", type=int, default=5, help="Maximum elements per nested list (default is 5)")
+    parser.add_argument("--cases", type=int, default=200, help="Number of random equivalence cases (default is 200)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed repetitions (default is 5)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for case in range(args.cases):
+        df = make_parents(int(rng.integers(0, 50)), int(rng.integers(1, args.max_children + 1)), rng)
+        expected = reference_flatten(df, 'PositionID', 'PositionLocation', FIELDS)
+        actual = flatten_list_column(df, 'PositionID', 'PositionLocation', FIELDS)
+        assert same_frame(expected, actual), f'case {case} differs from the reference'
+    print(f'{args.cases} random cases match the reference')
+
+    df = make_parents(args.rows, args.max_children, rng)
+    reference_time = min(timeit.repeat(lambda: reference_flatten(df, 'PositionID', 'PositionLocation', FIELDS), number=1, repeat=args.repeat))
+    flatten_time = min(timeit.repeat(lambda: flatten_list_column(df, 'PositionID', 'PositionLocation', FIELDS), number=1, repeat=args.repeat))
+    print(f'rows: {args.rows}')
+    print(f'explode + json_normalize: {reference_time * 1000:.2f} ms')
+    print(f'positional flatten:       {flatten_time * 1000:.2f} ms')
+    print(f'speedup:                  {reference_time / flatten_time:.1f}x')
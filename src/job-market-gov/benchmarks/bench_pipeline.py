@@ -0,0 +1,229 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'job-market-gov'))
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import job_listing
+from job_listing import normalize, remuneration_extractor, sub_object_json_extractor, write_to_parquet
+from flatten import flatten_list_column, first_list_item
+from streaming import iter_json_array
+from dataset import TABLES
+from instrument import peak_rss_mb, reset_peak_rss, rss_mb
+from synthetic import write_payload
+
+LOCATION_FIELDS = ['LocationName', 'CountryCode', 'CountrySubDivisionCode', 'CityName', 'Longitude', 'Latitude']
+SIZES = [1000, 10000, 100000]
+
+
+def _rows(tables):
+    return sum(len(t) for t in tables)
+
+
+def _normalized(path, data_dir):
+    return normalize(pd.read_json(path))
+
+
+def _with_user_area(path, data_dir):
+    df = pd.read_json(path)
+    return df.join(pd.json_normalize(df['UserArea'], sep='_'))
+
+
+def _with_remuneration(path, data_dir):
+    df = pd.read_json(path)
+    df = df.join(first_list_item(df, 'PositionRemuneration', ['MinimumRange', 'MaximumRange', 'RateIntervalCode']))
+    df['MinimumRange'] = pd.to_numeric(df['MinimumRange'])
+    df['MaximumRange'] = pd.to_numeric(df['MaximumRange'])
+    return df
+
+
+def _write(mode):
+    def run(tables):
+        write_to_parquet(*tables, first_run=True, mode=mode)
+        return _rows(tables)
+    return run
+
+
+def _main(**kwargs):
+    def run(path):
+        job_listing.main(path, True, **kwargs)
+        return None
+    return run
+
+
+def _pages(path, data_dir):
+    # Splits the payload into API sized page files, the input of the batch (multi-file) ingest
+    pages_dir = os.path.join(data_dir, 'pages')
+    os.makedirs(pages_dir)
+    for page, records in enumerate(iter_json_array(path, chunk_size=500)):
+        with open(os.path.join(pages_dir, f'page_{page + 1:05d}.json'), 'w') as f:
+            json.dump(records, f)
+    return pages_dir
+
+
+def _apply_salaries(df):
+    from bench_salary import apply_normalized_salaries
+    apply_normalized_salaries(df)
+    return len(df)
+
+
+# Stage name -> (setup(payload path, data dir) returning the stage input, timed run(input) returning the rows produced)
+STAGES = {
+    'read_json': (lambda path, data_dir: path, lambda path: len(pd.read_json(path))),
+    'iter_json_array': (lambda path, data_dir: path, lambda path: sum(len(chunk) for chunk in iter_json_array(path))),
+    'user_area': (lambda path, data_dir: pd.read_json(path),
+                  lambda df: len(pd.json_normalize(df['UserArea'], sep='_'))),
+    'locations': (lambda path, data_dir: pd.read_json(path),
+                  lambda df: len(sub_object_json_extractor(df, 'PositionLocation', LOCATION_FIELDS))),
+    'job_category': (lambda path, data_dir: pd.read_json(path),
+                     lambda df: len(sub_object_json_extractor(df, 'JobCategory', ['Name', 'Code']))),
+    'duties': (_with_user_area, lambda df: len(flatten_list_column(df, 'PositionID', 'Details_MajorDuties'))),
+    'salary': (lambda path, data_dir: pd.read_json(path), lambda df: len(remuneration_extractor(df))),
+    'normalize': (lambda path, data_dir: pd.read_json(path), lambda df: _rows(normalize(df))),
+    'write_rewrite': (_normalized, _write('rewrite')),
+    'write_append': (_normalized, _write('append')),
+    'write_merge': (_normalized, _write('merge')),
+    'end_to_end': (lambda path, data_dir: path, _main()),
+    'end_to_end_stream': (lambda path, data_dir: path, _main(stream=True)),
+    'end_to_end_merge': (lambda path, data_dir: path, _main(mode='merge')),
+    # One worker per CPU, the peak RSS is the one of the writing process (workers not included)
+    'end_to_end_batch': (_pages, _main()),
+    # Row-wise salary apply replaced by salary.normalize_salaries, only run when asked for
+    'salary_apply': (_with_remuneration, _apply_salaries),
+}
+DEFAULT_STAGES = [stage for stage in STAGES if stage != 'salary_apply']
+
+
+def written_rows(data_dir):
+    # Rows of the tables written by an end to end stage (single files or partitioned datasets)
+    rows = 0
+    for table in TABLES:
+        for path in [os.path.join(data_dir, table), os.path.join(data_dir, table + '.parquet')]:
+            if os.path.exists(path):
+                rows += ds.dataset(path, format='parquet').count_rows()
+    return rows
+
+
+def run_stage(stage, path):
+    """Runs one stage on a payload in this process and returns its measures."""
+    setup, run = STAGES[stage]
+    data_dir = tempfile.mkdtemp(prefix='bench-')
+    job_listing.DATA_DIR = os.path.join(data_dir, '')
+    try:
+        stage_input = setup(path, job_listing.DATA_DIR)
+        gc.collect()
+        peak_reset = reset_peak_rss()
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        rows_out = run(stage_input)
+        seconds = time.perf_counter() - start
+        if rows_out is None:
+            rows_out = written_rows(data_dir)
+        return {'seconds': seconds,
+                'rows_out': rows_out,
+                'rss_before_mb': rss_before,
+                'peak_rss_mb': peak_rss_mb(),
+                # Without a reset the peak also covers the setup of the stage
+                'peak_includes_setup': not peak_reset}
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def payload_path(work_dir, postings, seed, nesting):
+    """Generates the payload once per size and nesting, later runs reuse it."""
+    name = 'usajobs-{}-l{max_locations}-c{max_categories}-d{max_duties}-s{}.json'.format(postings, seed, **nesting)
+    path = os.path.join(work_dir, name)
+    if not os.path.exists(path):
+        print(f'generating {name}', flush=True)
+        write_payload(path + '.tmp', postings, seed, **nesting)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def benchmark(sizes=SIZES, stages=DEFAULT_STAGES, repeat=1, work_dir=None, seed=0, **nesting):
+    """Runs every stage on payloads of each size, each run in a fresh process so peaks are not shared.
+
+    Returns the report: the environment and a result per size and stage (best time, highest peak).
+    """
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), 'job-market-bench')
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    for postings in sizes:
+        path = payload_path(work_dir, postings, seed, nesting)
+        payload_mb = os.path.getsize(path) / (1024 * 1024)
+        for stage in stages:
+            runs = []
+            for _ in range(repeat):
+                worker = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', stage, path],
+                                        capture_output=True, text=True)
+                if worker.returncode:
+                    raise RuntimeError(f'{stage} failed on {postings} postings:\n{worker.stderr}')
+                runs.append(json.loads(worker.stdout.strip().splitlines()[-1]))
+            seconds = min(r['seconds'] for r in runs)
+            result = {'stage': stage,
+                      'postings': postings,
+                      'payload_mb': round(payload_mb, 2),
+                      'repeat': repeat,
+                      'seconds': seconds,
+                      'postings_per_s': postings / seconds,
+                      'mb_per_s': payload_mb / seconds,
+                      'rows_out': runs[0]['rows_out'],
+                      'rss_before_mb': runs[0]['rss_before_mb'],
+                      'peak_rss_mb': max(r['peak_rss_mb'] for r in runs),
+                      'peak_includes_setup': runs[0]['peak_includes_setup']}
+            results.append(result)
+            print(f"{postings:>9} {stage:<18} {seconds:9.3f}s {result['postings_per_s']:>12,.0f} postings/s "
+                  f"{result['peak_rss_mb']:9.1f} MB peak", flush=True)
+    return {'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'versions': {'pandas': pd.__version__, 'numpy': np.__version__, 'pyarrow': pa.__version__},
+            'payload': dict(nesting, seed=seed),
+            'results': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each stage of the job listing ingest, and the whole pipeline, on synthetic USAJobs payloads.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=SIZES,
+                        help=f"Numbers of postings (default is {' '.join(map(str, SIZES))}, up to 1000000 is supported)")
+    parser.add_argument("--stages", nargs='+', choices=list(STAGES), default=DEFAULT_STAGES,
+                        help="Stages to run (default is every stage but the legacy salary_apply)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage, the best time is reported (default is 1)")
+    parser.add_argument("--max_locations", type=int, default=3, help="Maximum locations per posting (default is 3)")
+    parser.add_argument("--max_categories", type=int, default=2, help="Maximum job categories per posting (default is 2)")
+    parser.add_argument("--max_duties", type=int, default=5, help="Maximum major duties per posting (default is 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the payloads (default is 0)")
+    parser.add_argument("--work_dir", type=str, default=None, help="Directory the payloads are generated in (default is a temporary directory)")
+    parser.add_argument("--out", type=str, default='bench_pipeline.json', help="JSON report (default is bench_pipeline.json)")
+    parser.add_argument("--worker", nargs=2, metavar=('STAGE', 'PAYLOAD'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_stage(*args.worker)))
+    else:
+        report = benchmark(args.sizes, args.stages, args.repeat, args.work_dir, args.seed, max_locations=args.max_locations,
+                           max_categories=args.max_categories, max_duties=args.max_duties)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'report written to {args.out}')
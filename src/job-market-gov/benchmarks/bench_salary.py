@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'job-market-gov'))
+from salary import normalize_salaries
+
+
+def apply_normalized_salaries(df):
+    # Row-wise path previously used in remuneration_extractor
+    def normalized_salary(row,col_name):
+        s = row[col_name]
+        rateCode = row['RateIntervalCode']
+        if rateCode=='PH':
+            return 40*52*s
+        elif rateCode=='PA':
+            return s
+
+    return {'NormalizedMinSalary': df.apply(lambda row: normalized_salary(row, 'MinimumRange'), axis=1),
+            'NormalizedMaxSalary': df.apply(lambda row: normalized_salary(row, 'MaximumRange'), axis=1)}
+
+
+def make_remuneration(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    minimum = rng.uniform(15, 120000, rows).round(2)
+    return pd.DataFrame({'MinimumRange': minimum,
+                         'MaximumRange': (minimum * rng.uniform(1, 1.5, rows)).round(2),
+                         'RateIntervalCode': rng.choice(['PA', 'PH', 'PD', 'PW', 'BW', 'PM', 'WC'], rows, p=[.8, .1, .02, .02, .02, .02, .02])})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the row-wise and vectorized salary normalization.")
+    parser.add_argument("--rows", type=int, default=10000, help="Number of postings (default is 10000, one full API query)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed repetitions (default is 5)")
+    args = parser.parse_args()
+
+    df = make_remuneration(args.rows)
+    # Both paths agree on the codes the row-wise path supports
+    legacy = apply_normalized_salaries(df)
+    vectorized = normalize_salaries(df)
+    supported = df['RateIntervalCode'].isin(['PA', 'PH']).to_numpy()
+    for col in vectorized:
+        assert np.allclose(legacy[col].to_numpy(dtype=float)[supported], vectorized[col][supported])
+
+    apply_time = min(timeit.repeat(lambda: apply_normalized_salaries(df), number=1, repeat=args.repeat))
+    vectorized_time = min(timeit.repeat(lambda: normalize_salaries(df), number=1, repeat=args.repeat))
+    print(f'rows: {args.rows}')
+    print(f'apply:      {apply_time * 1000:.2f} ms')
+    print(f'vectorized: {vectorized_time * 1000:.2f} ms')
+    print(f'speedup:    {apply_time / vectorized_time:.1f}x')
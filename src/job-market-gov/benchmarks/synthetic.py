@@ -0,0 +1,75 @@
+import argparse
+import json
+import numpy as np
+
+# Shares of the rate interval codes in the generated postings, most USAJobs postings are yearly
+RATE_CODES = ['PA', 'PH', 'PD', 'PW', 'BW', 'PM', 'SY', 'WC']
+RATE_SHARES = [.8, .1, .02, .02, .02, .02, .01, .01]
+# Minimum pay range of each rate interval (per hour, day, week...)
+PAY_RANGES = {'PA': (30000, 150000), 'SY': (30000, 150000), 'PM': (2500, 12500), 'BW': (1150, 5750),
+              'PW': (575, 2900), 'PD': (115, 575), 'PH': (15, 72), 'WC': (0, 0)}
+STATES = ['Virginia', 'Maryland', 'District of Columbia', 'Texas', 'California', 'Colorado', 'Washington', 'Georgia']
+DEPARTMENTS = ['Department of Defense', 'Department of Veterans Affairs', 'Department of the Interior',
+               'Department of Homeland Security', 'Department of Agriculture']
+
+
+def make_posting(i, rng, max_locations=3, max_categories=2, max_duties=5, text_size=200):
+    """One posting with the fields kept by the jq filter of run.sh (and fetcher.select_fields).
+
+    The nested lists have between 1 and max_* elements (duties between 0 and max_duties).
+    """
+    code = RATE_CODES[rng.choice(len(RATE_CODES), p=RATE_SHARES)]
+    minimum = rng.uniform(*PAY_RANGES[code])
+    locations = []
+    for j in range(rng.integers(1, max_locations + 1)):
+        state = STATES[rng.integers(len(STATES))]
+        locations.append({'LocationName': f'City {i % 997}-{j}, {state}',
+                          'CountryCode': 'United States',
+                          'CountrySubDivisionCode': state,
+                          'CityName': f'City {i % 997}-{j}',
+                          'Longitude': round(float(rng.uniform(-124, -70)), 4),
+                          'Latitude': round(float(rng.uniform(25, 49)), 4)})
+    text = 'x' * text_size
+    return {
+        'PositionID': f'SYN-{i}',
+        'PositionTitle': f'Position {i % 5000}',
+        'PositionLocationDisplay': locations[0]['LocationName'] if len(locations) == 1 else 'Multiple Locations',
+        'PositionLocation': locations,
+        'OrganizationName': f'Organization {i % 300}',
+        'DepartmentName': DEPARTMENTS[rng.integers(len(DEPARTMENTS))],
+        'JobCategory': [{'Name': f'Category {c}', 'Code': str(c)}
+                        for c in rng.integers(100, 2300, rng.integers(1, max_categories + 1))],
+        'QualificationSummary': text,
+        'PositionRemuneration': [{'MinimumRange': f'{minimum:.2f}',
+                                  'MaximumRange': f'{minimum * rng.uniform(1, 1.5):.2f}',
+                                  'RateIntervalCode': code,
+                                  'Description': code}],
+        'PublicationStartDate': f'2025-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}T00:00:00.0000',
+        'UserArea': {'Details': {'JobSummary': text,
+                                 'MajorDuties': [f'Duty {k} {text[:50]}' for k in range(rng.integers(0, max_duties + 1))]}},
+    }
+
+
+def write_payload(path, postings, seed=0, **nesting):
+    """Writes a JSON array of synthetic postings (the merged main.json of run.sh) one posting at a time."""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        f.write('[')
+        for i in range(postings):
+            if i:
+                f.write(',\n')
+            json.dump(make_posting(i, rng, **nesting), f)
+        f.write(']')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic USAJobs JSON payload.")
+    parser.add_argument("path", type=str, help="Output JSON file")
+    parser.add_argument("--postings", type=int, default=10000, help="Number of postings (default is 10000)")
+    parser.add_argument("--max_locations", type=int, default=3, help="Maximum locations per posting (default is 3)")
+    parser.add_argument("--max_categories", type=int, default=2, help="Maximum job categories per posting (default is 2)")
+    parser.add_argument("--max_duties", type=int, default=5, help="Maximum major duties per posting (default is 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default is 0)")
+    args = parser.parse_args()
+    write_payload(args.path, args.postings, args.seed, max_locations=args.max_locations,
+                  max_categories=args.max_categories, max_duties=args.max_duties)
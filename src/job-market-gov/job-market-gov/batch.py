@@ -0,0 +1,79 @@
+import glob
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import instrument
+
+
+def input_files(paths):
+    """JSON files to ingest from files, directories (their *.json files) and glob patterns, in name order."""
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, '*.json'))
+        elif glob.has_magic(path):
+            files += glob.glob(path)
+        else:
+            files.append(path)
+    return sorted(set(files))
+
+
+def ordered_map(fn, items, workers=None, pending=2):
+    """Yields (item, fn(item)) in the order of items, computing up to `workers` of them in parallel processes.
+
+    At most workers * pending results are computed ahead of the consumer, so memory stays bounded
+    when the consumer (the writer) is slower than the workers. With one worker fn runs in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for item in items:
+            yield item, fn(item)
+        return
+    pool = ProcessPoolExecutor(workers, initializer=instrument.detach)
+    try:
+        queue = deque()
+        for item in items:
+            queue.append((item, pool.submit(fn, item)))
+            if len(queue) >= workers * pending:
+                item, future = queue.popleft()
+                yield item, future.result()
+        while queue:
+            item, future = queue.popleft()
+            yield item, future.result()
+    finally:
+        # On error the queued files are not normalized for nothing
+        pool.shutdown(cancel_futures=True)
+
+
+class TableBuffer:
+    """Concatenates the tables of consecutive files until they hold batch_rows postings.
+
+    Writing fewer, larger batches keeps the append/merge datasets from getting a file per
+    input file and partition, and the rewrite tables from getting tiny row groups.
+    """
+
+    def __init__(self, batch_rows):
+        self.batch_rows = batch_rows
+        self.tables = {}
+        self.rows = 0
+        self.files = 0
+
+    def add(self, tables):
+        for df_name, df_current in tables.items():
+            self.tables.setdefault(df_name, []).append(df_current)
+        self.rows += len(tables['jobs'])
+        self.files += 1
+        return self.rows >= self.batch_rows
+
+    def pop(self):
+        """Returns the concatenated tables and the number of files they come from."""
+        files = self.files
+        tables = {df_name: pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+                  for df_name, frames in self.tables.items()}
+        self.tables = {}
+        self.rows = 0
+        self.files = 0
+        return tables, files
@@ -0,0 +1,196 @@
+import argparse
+import fcntl
+import glob
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from schema import (SCHEMAS, PARTITION_FIELD, ROW_GROUP_SIZE, conform, dataset_schema, dataset_write_options,
+                    file_schema, to_table, write_table)
+
+TABLES = list(SCHEMAS)
+PARTITION_COL = PARTITION_FIELD.name
+PARTITIONING = ds.partitioning(pa.schema([PARTITION_FIELD]), flavor='hive')
+# Held shared by the writers for a whole run and by the readers for a scan, exclusively by the compaction
+LOCK_FILE = '.dataset.lock'
+
+
+def key_runs(keys):
+    """Run number of each row and the key of each run, a run being consecutive rows with the same key."""
+    keys = np.asarray(keys, dtype=object)
+    starts = np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.zeros(0, dtype=bool)
+    return np.cumsum(starts) - 1, keys[starts]
+
+
+def add_partition_col(jobs, child):
+    # Child tables are partitioned by the publication date of their parent posting. A batch can hold a
+    # posting several times (pages or files concatenated), child rows come in the order of their parents
+    # so the n-th run of a key in child belongs to the n-th run in jobs
+    jobs_runs, jobs_run_keys = key_runs(jobs['PositionID'])
+    child_runs, child_run_keys = key_runs(child['PositionID'])
+    if len(jobs_run_keys) == len(child_run_keys) and (jobs_run_keys == child_run_keys).all():
+        run_dates = jobs[PARTITION_COL].to_numpy()[np.searchsorted(jobs_runs, np.arange(len(jobs_run_keys)))]
+        return child.assign(**{PARTITION_COL: run_dates[child_runs]})
+    dates = jobs[['PositionID', PARTITION_COL]].drop_duplicates('PositionID')
+    return child.merge(dates, on='PositionID', how='left')
+
+
+def read_dataset(data_dir, df_name, **kwargs):
+    """Reads one table of the partitioned dataset as a pyarrow Dataset (with its typed schema, files written before it are cast)."""
+    kwargs.setdefault('schema', dataset_schema(df_name))
+    return ds.dataset(os.path.join(data_dir, df_name), format='parquet', partitioning=PARTITIONING, **kwargs)
+
+
+def lock_dataset(data_dir, exclusive=False, wait=True):
+    """Takes the dataset lock, shared (writers and readers, several can run at once) or exclusive (compaction).
+
+    Returns the locked file descriptor, released by unlock_dataset or when the process exits,
+    or None if wait is False and the lock is held.
+    """
+    lock = os.open(os.path.join(data_dir, LOCK_FILE), os.O_CREAT | os.O_RDWR)
+    try:
+        fcntl.flock(lock, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if wait else fcntl.LOCK_NB))
+    except BlockingIOError:
+        os.close(lock)
+        return None
+    return lock
+
+
+def relock_dataset(lock, exclusive):
+    # Turns a held lock into an exclusive or a shared one (waits for the other holders)
+    fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def unlock_dataset(lock):
+    os.close(lock)
+
+
+@contextmanager
+def dataset_lock(data_dir):
+    """Holds the shared dataset lock for the block, e.g. while scanning the tables, so a compaction
+    does not remove the files being read (the block waits for a running compaction).
+
+    Readers of a data directory they can not write to (no lock file can be created) go without it.
+    """
+    try:
+        lock = lock_dataset(data_dir)
+    except OSError:
+        lock = None
+    try:
+        yield
+    finally:
+        if lock is not None:
+            unlock_dataset(lock)
+
+
+class DatasetAppendWriter:
+    """Appends each batch of the output tables as new files of a Hive partitioned dataset.
+
+    Existing files are never read or rewritten, so the cost of a run depends only on the new batch.
+    Layout: <data_dir>/<table>/date_col=YYYY-MM-DD/part-<run_id>-<batch>-<i>.parquet
+    The dataset lock is held from the creation of the writer to close() or abort(), so a compaction
+    never reads files being written or removed (a writer waits for a running compaction).
+    """
+
+    def __init__(self, data_dir, first_run=False):
+        self.data_dir = data_dir
+        self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:8]
+        self.batch = 0
+        self.written = []
+        # Publication dates written or removed by this run, the summaries of query.py are refreshed for them
+        self.dates = set()
+        os.makedirs(data_dir, exist_ok=True)
+        self.lock = lock_dataset(data_dir)
+        if first_run:
+            for df_name in TABLES:
+                shutil.rmtree(os.path.join(data_dir, df_name), ignore_errors=True)
+
+    def write(self, tables):
+        jobs = tables['jobs']
+        self.dates.update(jobs[PARTITION_COL].dropna().unique())
+        for df_name, df_current in tables.items():
+            if PARTITION_COL not in df_current.columns:
+                df_current = add_partition_col(jobs, df_current)
+            ds.write_dataset(to_table(df_current, df_name, partitioned=True),
+                             os.path.join(self.data_dir, df_name),
+                             format='parquet',
+                             partitioning=PARTITIONING,
+                             file_options=dataset_write_options(),
+                             max_rows_per_group=ROW_GROUP_SIZE,
+                             basename_template=f'part-{self.run_id}-{self.batch}-{{i}}.parquet',
+                             existing_data_behavior='overwrite_or_ignore',
+                             file_visitor=lambda written_file: self.written.append(written_file.path))
+        self.batch += 1
+
+    def _unlock(self):
+        if self.lock is not None:
+            unlock_dataset(self.lock)
+            self.lock = None
+
+    def close(self, before_release=None):
+        """Ends the run. before_release is called while the lock is still held, once the tables are
+        complete (the summaries of query.py are refreshed there, before a compaction can start)."""
+        if before_release is not None:
+            before_release()
+        self._unlock()
+
+    def abort(self):
+        # Remove only the files written by this run
+        for path in self.written:
+            if os.path.exists(path):
+                os.remove(path)
+        self.written = []
+        self._unlock()
+
+
+def compact_partition(partition_dir, df_name, min_files=2):
+    """Merges the part files of one partition directory of df_name into a single file.
+
+    The merged file is written under a hidden name (ignored by dataset discovery), renamed into
+    place and only then are the merged inputs removed. Files appended meanwhile are left alone.
+    Files written before the typed schema are cast to it. Returns the number of files merged.
+    """
+    files = sorted(glob.glob(os.path.join(partition_dir, 'part-*.parquet')))
+    if len(files) < min_files:
+        return 0
+    schema = file_schema(df_name, partitioned=True)
+    table = pa.concat_tables([conform(pq.read_table(f, partitioning=None), schema, df_name) for f in files])
+    compact_id = uuid.uuid4().hex[:8]
+    tmp_path = os.path.join(partition_dir, f'.compact-{compact_id}.parquet')
+    write_table(table, tmp_path)
+    os.replace(tmp_path, os.path.join(partition_dir, f'part-compacted-{compact_id}-0.parquet'))
+    for f in files:
+        os.remove(f)
+    return len(files)
+
+
+def compact_dataset(data_dir, tables=TABLES, min_files=2):
+    """Compacts every partition of the given tables, skipping if a writer, a reader or another compaction is running."""
+    lock = lock_dataset(data_dir, exclusive=True, wait=False)
+    if lock is None:
+        print(f'dataset in use by an ingest, a query or another compaction ({os.path.join(data_dir, LOCK_FILE)} is locked)')
+        return
+    try:
+        for df_name in tables:
+            for partition_dir in sorted(glob.glob(os.path.join(data_dir, df_name, f'{PARTITION_COL}=*'))):
+                merged = compact_partition(partition_dir, df_name, min_files=min_files)
+                if merged:
+                    print(f'{partition_dir}: merged {merged} files')
+    finally:
+        unlock_dataset(lock)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the small files of the partitioned job market dataset.")
+    parser.add_argument("data_dir", type=str, help="Path to the dataset directory (e.g. ./job-market-gov/data/)")
+    parser.add_argument("--min_files",
+                        type=int,
+                        default=2,
+                        help="Only compact partitions with at least this many files (default is 2)")
+    args = parser.parse_args()
+    compact_dataset(args.data_dir, min_files=args.min_files)
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import http.client
+import json
+import math
+import os
+import random
+import threading
+import urllib.error
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import instrument
+from instrument import stage
+from job_listing import normalize_stage, write_stage, close_stage, get_writer, start_compaction
+from salary import HOURS_PER_WEEK, WEEKS_PER_YEAR
+
+#Search Jobs API rate limitations
+#Maximum of 10,000 rows per query
+#Maximum of 500 rows per page
+BASE_URL = 'https://data.usajobs.gov/api/search'
+ROWS_PER_PAGE = 500
+MAX_ROWS = 10000
+RETRY_STATUS = {429, 500, 502, 503, 504}
+FIELDS = ['PositionID', 'PositionTitle', 'PositionLocationDisplay', 'PositionLocation', 'OrganizationName',
+          'DepartmentName', 'JobCategory', 'QualificationSummary', 'PositionRemuneration', 'PublicationStartDate']
+
+
+def select_fields(item):
+    # Same projection as the jq filter of run.sh
+    descriptor = item['MatchedObjectDescriptor']
+    details = (descriptor.get('UserArea') or {}).get('Details') or {}
+    row = {field: descriptor.get(field) for field in FIELDS}
+    row['UserArea'] = {'Details': {'JobSummary': details.get('JobSummary'),
+                                   'MajorDuties': details.get('MajorDuties')}}
+    return row
+
+
+class UsaJobsFetcher:
+    """Fetches the pages of a USAJobs search concurrently.
+
+    At most `concurrency` requests are in flight; 429/5xx responses and connection errors are
+    retried with exponential backoff (honouring Retry-After). Each worker thread keeps one
+    keep-alive http.client connection to the API, so pages after the first reuse an open
+    TCP/TLS connection instead of connecting for every request.
+    """
+
+    def __init__(self, email, auth_key, base_url=BASE_URL, date_posted=60, concurrency=4,
+                 retries=5, backoff=1.0, timeout=60):
+        self.headers = {'User-Agent': email, 'Authorization-Key': auth_key}
+        self.base_url = base_url
+        self.url = urllib.parse.urlsplit(base_url)
+        self.date_posted = date_posted
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _connection(self):
+        # One connection per worker thread, opened on its first request
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+            connection = cls(self.url.hostname, self.url.port, timeout=self.timeout)
+            self.local.connection = connection
+            self.connections.append(connection)
+        return connection
+
+    def _get(self, page):
+        query = urllib.parse.urlencode({'page': page, 'ResultsPerPage': ROWS_PER_PAGE, 'DatePosted': self.date_posted})
+        connection = self._connection()
+        try:
+            connection.request('GET', f'{self.url.path}?{query}', headers=self.headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Closed, the connection is reopened by the next request of this worker
+            connection.close()
+            raise urllib.error.URLError(e) from e
+        if response.status != 200:
+            raise urllib.error.HTTPError(f'{self.base_url}?{query}', response.status, response.reason, response.headers, None)
+        return json.loads(body)
+
+    async def fetch_page(self, page):
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    return page, await loop.run_in_executor(self.executor, self._get, page)
+                except urllib.error.HTTPError as e:
+                    if e.code not in RETRY_STATUS or attempt == self.retries:
+                        raise
+                    retry_after = e.headers.get('Retry-After')
+                    delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+                except (urllib.error.URLError, TimeoutError, ConnectionError):
+                    if attempt == self.retries:
+                        raise
+                    delay = self.backoff * 2 ** attempt
+                print(f'Page {page}: retry {attempt + 1} in {delay:.1f}s')
+                await asyncio.sleep(delay + random.uniform(0, self.backoff))
+
+    async def pages(self):
+        """Yields (page number, response) as soon as each page arrives, page 1 first."""
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.local = threading.local()
+        self.connections = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as self.executor:
+                first = await self.fetch_page(1)
+                yield first
+                total = min(first[1]['SearchResult'].get('SearchResultCountAll', 0), MAX_ROWS)
+                tasks = [asyncio.create_task(self.fetch_page(page))
+                         for page in range(2, math.ceil(total / ROWS_PER_PAGE) + 1)]
+                try:
+                    for task in asyncio.as_completed(tasks):
+                        yield await task
+                finally:
+                    for task in tasks:
+                        task.cancel()
+        finally:
+            for connection in self.connections:
+                connection.close()
+
+
+async def fetch_and_ingest(fetcher, first_run, mode='rewrite', salary_factors=None, pages_dir=None):
+    """Streams every fetched page through the job_listing normalization into the output tables."""
+    writer = get_writer(first_run, mode)
+    try:
+        async for page, data in fetcher.pages():
+            records = [select_fields(item) for item in data['SearchResult']['SearchResultItems']]
+            print(f'Page: {page}')
+            print(f'Result Count: {len(records)}')
+            if pages_dir:
+                with open(os.path.join(pages_dir, f'page_{page}.json'), 'w') as f:
+                    json.dump(records, f)
+            if not records:
+                continue
+            jobs, duties, locations, job_category = normalize_stage(pd.DataFrame(records), salary_factors, page=page)
+            write_stage(writer, {'jobs': jobs,
+                                 'duties': duties,
+                                 'locations': locations,
+                                 'job_category': job_category}, page=page)
+    except BaseException:
+        writer.abort()
+        raise
+    close_stage(writer, first_run)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch USAJobs listings concurrently and store them in parquet files.")
+    parser.add_argument("--first_run", action="store_true", help="Indicate it's the first run (overwrite existing data)")
+    parser.add_argument("--mode", choices=['rewrite', 'append', 'merge'], default='rewrite',
+                        help="Output mode, see job_listing.py (default is rewrite)")
+    parser.add_argument("--compact", action="store_true",
+                        help="In append/merge mode, merge small dataset files in a background process after the run")
+    parser.add_argument("--date_posted", type=int, default=60, help="Fetch postings of the last N days (default is 60)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of requests in flight (default is 4)")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per page on 429/5xx/connection errors (default is 5)")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Base delay in seconds of the exponential backoff (default is 1.0)")
+    parser.add_argument("--base_url", type=str, default=BASE_URL, help=f"Search API URL (default is {BASE_URL})")
+    parser.add_argument("--pages_dir", type=str, default=None, help="Also save each selected page as page_N.json in this directory")
+    parser.add_argument("--hours_per_week", type=float, default=HOURS_PER_WEEK,
+                        help=f"Working hours per week used to annualize hourly salaries (default is {HOURS_PER_WEEK})")
+    parser.add_argument("--weeks_per_year", type=float, default=WEEKS_PER_YEAR,
+                        help=f"Paid weeks per year used to annualize salaries (default is {WEEKS_PER_YEAR})")
+    parser.add_argument("--profile", nargs='?', const='-', default=None,
+                        help="Log the wall time, rows in/out and peak memory of each stage as JSON lines, to this file or to stderr")
+    parser.add_argument("--trace", type=str, default=None,
+                        help="Also write the stages as a Chrome trace file (chrome://tracing, Perfetto)")
+    args = parser.parse_args()
+
+    if args.pages_dir:
+        os.makedirs(args.pages_dir, exist_ok=True)
+    fetcher = UsaJobsFetcher(os.environ['API_EMAIL'], os.environ['API_AUTH'], base_url=args.base_url,
+                             date_posted=args.date_posted, concurrency=args.concurrency, retries=args.retries,
+                             backoff=args.backoff)
+    salary_factors = {'hours_per_week': args.hours_per_week, 'weeks_per_year': args.weeks_per_year}
+    if args.profile or args.trace:
+        instrument.enable(args.profile, args.trace)
+    print("Connection to API started")
+    try:
+        with stage('ingest', mode=args.mode):
+            asyncio.run(fetch_and_ingest(fetcher, args.first_run, args.mode, salary_factors, args.pages_dir))
+    finally:
+        instrument.disable()
+    print("Connection to API ended")
+    if args.compact and args.mode in ('append', 'merge'):
+        start_compaction()
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+
+def list_lengths(lists):
+    """Number of elements of each list (0 for missing values)."""
+    return np.fromiter((len(v) if isinstance(v, list) else 0 for v in lists), dtype=np.int64, count=len(lists))
+
+
+def flatten_list_column(df, key, list_col, fields=None, keep_empty=True):
+    """Builds a child table with one row per element of df[list_col], keyed by df[key].
+
+    Parent keys are repeated positionally with the list lengths (np.repeat), so every child row
+    carries the key of the row it came from regardless of df's index. With fields, elements are
+    dicts and one column per field is extracted; without, the elements themselves are the values
+    of a list_col column. Like DataFrame.explode, parents with an empty or missing list keep one
+    row of nulls unless keep_empty is False.
+    """
+    lists = df[list_col].tolist()
+    lengths = list_lengths(lists)
+    items = []
+    for v in lists:
+        if isinstance(v, list) and v:
+            items.extend(v)
+        elif keep_empty:
+            items.append(None)
+    repeats = np.maximum(lengths, 1) if keep_empty else lengths
+    parents = np.repeat(np.arange(len(lists)), repeats)
+
+    if fields is None:
+        child = pd.DataFrame({list_col: items})
+    else:
+        empty = [None] * len(fields)
+        child = pd.DataFrame([[item.get(field) for field in fields] if isinstance(item, dict) else empty
+                              for item in items], columns=fields)
+    child.insert(0, key, df[key].to_numpy()[parents])
+    return child
+
+
+def first_list_item(df, list_col, fields):
+    """Extracts fields from the first element of df[list_col], one row per parent aligned with df."""
+    empty = [None] * len(fields)
+    return pd.DataFrame([[v[0].get(field) for field in fields] if isinstance(v, list) and v and isinstance(v[0], dict) else empty
+                         for v in df[list_col].tolist()], columns=fields, index=df.index)
@@ -0,0 +1,197 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+# Set by enable(), stage() is a no-op while it is None
+_tracer = None
+
+
+def _status_mb(field):
+    # VmRSS/VmHWM of /proc/self/status, None where there is no /proc
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def rss_mb():
+    """Current RSS of the process, None where there is no /proc."""
+    return _status_mb('VmRSS')
+
+
+def reset_peak_rss():
+    """Resets the peak RSS of the process to its current RSS (Linux only), returns whether it could."""
+    # Writing 5 to clear_refs resets VmHWM
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak RSS of the process since the last reset_peak_rss() (since it started where it can not be reset)."""
+    peak = _status_mb('VmHWM')
+    if peak is None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return peak
+
+
+class _NoStage:
+    """Returned by stage() when instrumentation is off."""
+    rows_in = None
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NO_STAGE = _NoStage()
+
+
+class Stage:
+    """A timed stage, set rows_out inside the with block to record the rows it produced."""
+
+    def __init__(self, tracer, name, rows_in, fields):
+        self.tracer = tracer
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.fields = fields
+        self.peak_mb = 0
+
+    def __enter__(self):
+        self.tracer._start(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer._end(self, failed=exc_type is not None)
+        return False
+
+
+class Tracer:
+    """Records stages as JSON lines (one per finished stage) and optionally as a Chrome trace.
+
+    Peak memory is the highest RSS while the stage ran, nested stages included. It is exact on
+    Linux (the kernel's peak is reset at each stage start); elsewhere it is the process peak so far.
+    """
+
+    def __init__(self, log=None, trace_path=None):
+        self.log = log or sys.stderr
+        self.trace_path = trace_path
+        self.events = []
+        self.stack = []
+        self.origin = time.perf_counter()
+        self.resettable = reset_peak_rss()
+
+    def _start(self, stage):
+        if self.resettable:
+            # The peak until now belongs to the open stages, then measure this one from here
+            peak = peak_rss_mb()
+            for parent in self.stack:
+                parent.peak_mb = max(parent.peak_mb, peak)
+            reset_peak_rss()
+        self.stack.append(stage)
+        stage.path = '/'.join(s.name for s in self.stack)
+        stage.rss_start_mb = rss_mb()
+        stage.start = time.perf_counter()
+
+    def _end(self, stage, failed=False):
+        end = time.perf_counter()
+        peak = peak_rss_mb()
+        self.stack.pop()
+        stage.peak_mb = max(stage.peak_mb, peak)
+        for parent in self.stack:
+            parent.peak_mb = max(parent.peak_mb, stage.peak_mb)
+        record = {'event': 'stage',
+                  'stage': stage.name,
+                  'path': stage.path,
+                  'wall_s': round(end - stage.start, 6),
+                  'rows_in': stage.rows_in,
+                  'rows_out': stage.rows_out,
+                  'rss_start_mb': stage.rss_start_mb,
+                  'rss_end_mb': rss_mb(),
+                  'peak_rss_mb': stage.peak_mb,
+                  **stage.fields}
+        if failed:
+            record['failed'] = True
+        print(json.dumps(record), file=self.log, flush=True)
+        if self.trace_path:
+            args = {k: v for k, v in record.items() if k not in ('event', 'stage', 'wall_s') and v is not None}
+            self.events.append({'name': stage.name, 'cat': 'stage', 'ph': 'X', 'pid': os.getpid(),
+                                'tid': threading.get_ident(), 'ts': (stage.start - self.origin) * 1e6,
+                                'dur': (end - stage.start) * 1e6, 'args': args})
+            self.events.append({'name': 'peak_rss_mb', 'ph': 'C', 'pid': os.getpid(),
+                                'ts': (end - self.origin) * 1e6, 'args': {'peak_rss_mb': stage.peak_mb}})
+
+    def close(self):
+        if self.trace_path:
+            # Chrome trace event format, open in chrome://tracing or https://ui.perfetto.dev
+            with open(self.trace_path, 'w') as f:
+                json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+        if self.log not in (sys.stderr, sys.stdout):
+            self.log.close()
+
+
+def enable(log_path=None, trace_path=None):
+    """Starts recording stages, as JSON lines to log_path (stderr if None) and to a Chrome trace."""
+    global _tracer
+    log = open(log_path, 'a') if log_path and log_path != '-' else None
+    _tracer = Tracer(log, trace_path)
+    return _tracer
+
+
+def disable():
+    """Stops recording and writes the Chrome trace."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def detach():
+    """Drops the tracer inherited by a forked worker process, without closing the parent's log."""
+    global _tracer
+    _tracer = None
+
+
+def stage(name, rows_in=None, **fields):
+    """Context manager timing a stage of the pipeline, a shared no-op unless enable() was called."""
+    if _tracer is None:
+        return NO_STAGE
+    return Stage(_tracer, name, rows_in, fields)
+
+
+def stages(name, iterable, **fields):
+    """Times every step of an iterable (e.g. reading the next chunk) as a stage, numbered by chunk."""
+    if _tracer is None:
+        return iterable
+    return _timed(name, iter(iterable), fields)
+
+
+def _timed(name, iterator, fields):
+    chunk = 0
+    while True:
+        with stage(name, chunk=chunk, **fields) as s:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                s.rows_out = 0
+                return
+            s.rows_out = len(item) if hasattr(item, '__len__') else None
+        yield item
+        chunk += 1
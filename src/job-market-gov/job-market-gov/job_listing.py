@@ -1,95 +1,277 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import argparse
 import os
+import subprocess
+import sys
+from functools import partial
+from streaming import iter_json_array, ParquetStreamWriter
+from dataset import DatasetAppendWriter
+from upsert import DatasetMergeWriter
+from salary import normalize_salaries, HOURS_PER_WEEK, WEEKS_PER_YEAR
+from flatten import flatten_list_column, first_list_item
+from batch import input_files, ordered_map, TableBuffer
+from schema import SCHEMAS, conform, to_table, write_table
+from query import refresh_summaries
+import instrument
+from instrument import stage
 
+DATA_DIR = './job-market-gov/data/'
 
-def sub_object_json_extractor(df,json_col,columns_to_keep):
-    loce_df = df[['PositionID',json_col]].explode(json_col)#this wil be moved to its own table
-
-    # Flatten the nested dictionary in the 'PositionLocation' column
-    location_df = pd.json_normalize(loce_df[json_col])
-    # Merge back into the original dataframe
-    locations = loce_df.join(location_df[columns_to_keep]).drop(json_col,axis=1)
-    return locations
 
-def remuneration_extractor(df):
-    # Flatten the nested dictionary in the 'PositionLocation' column
-    remuneration_df_explode = df.explode('PositionRemuneration')
-    remuneration_df = pd.json_normalize(remuneration_df_explode['PositionRemuneration'])
+def sub_object_json_extractor(df,json_col,columns_to_keep):
+    # One row per element of the nested list, keyed positionally by the parent PositionID (this wil be moved to its own table)
+    return flatten_list_column(df,'PositionID',json_col,columns_to_keep)
 
-    # Select only the required columns
+def remuneration_extractor(df,**salary_factors):
+    # Flatten the first element of the nested 'PositionRemuneration' list, aligned with the postings
     columns_to_keep = ['MinimumRange', 'MaximumRange','RateIntervalCode']
+    remuneration_df = first_list_item(df,'PositionRemuneration',columns_to_keep)
 
     # Merge back into the original dataframe
-    df = df.join(remuneration_df[columns_to_keep])
+    df = df.join(remuneration_df)
 
     df['MinimumRange'] = pd.to_numeric(df['MinimumRange'])
     df['MaximumRange'] = pd.to_numeric(df['MaximumRange'])
     #feature generating
-    #Yearly Salary=Hourly Wage×40×52
-    def normalized_salary(row,col_name):
-        s = row[col_name]
-        rateCode = row['RateIntervalCode']
-        if rateCode=='PH':
-            return 40*52*s
-        elif rateCode=='PA':
-            return s
-
-    df['NormalizedMinSalary'] = df.apply(lambda row: normalized_salary(row, 'MinimumRange'), axis=1)
-    df['NormalizedMaxSalary'] = df.apply(lambda row: normalized_salary(row, 'MaximumRange'), axis=1)
+    #Yearly Salary=Amount×(periods per year of RateIntervalCode), e.g. Hourly Wage×40×52
+    df = df.assign(**normalize_salaries(df,**salary_factors))
     df['NormalizedMeanSalary'] = df[["NormalizedMinSalary", "NormalizedMaxSalary"]].mean(axis=1)
     df['NormalizedRangeSalary'] = df['NormalizedMaxSalary']-df['NormalizedMinSalary']
     return df
 
 
-def write_to_parquet(jobs,duties,locations,job_category,first_run):
-    os.makedirs('./job-market-gov/data/', exist_ok=True)
+def write_to_parquet(jobs,duties,locations,job_category,first_run,mode='rewrite'):
+    os.makedirs(DATA_DIR, exist_ok=True)
     # Path to the Parquet file
     files_dict = {'jobs':jobs,
                   'duties':duties,
                   'locations':locations,
                   'job_category':job_category}
+    if mode in ('append','merge'):
+        # Write the batch as new files of the partitioned dataset, existing files are not rewritten
+        writer = get_writer(first_run,mode)
+        write_stage(writer,files_dict)
+        close_stage(writer,first_run)
+        return
     for df_name,df_current in files_dict.items():
-        p_path = f'./job-market-gov/data/{df_name}.parquet'
-        if first_run:
-            # Write the DataFrame back to the Parquet file
-            df_current.to_parquet(p_path, engine='pyarrow', index=False)
-        else:
-            try:
-                # Try reading the existing Parquet file
-                existing_df = pd.read_parquet(p_path)
-                # Append the new data to the existing DataFrame
-                combined_df = pd.concat([existing_df, df_current], ignore_index=True)
-            except FileNotFoundError:
-                # If the file doesn't exist, create a new DataFrame with the new data
-                combined_df = df_current
+        with stage('write',len(df_current),table=df_name) as s:
+            s.rows_out = rewrite_table(df_name,df_current,first_run)
+    summaries_stage(first_run,set(jobs['date_col'].dropna().unique()))
 
-            # Write the combined DataFrame back to the Parquet file
-            combined_df.to_parquet(p_path, engine='pyarrow', index=False)
 
+def rewrite_table(df_name,df_current,first_run):
+    p_path = f'{DATA_DIR}{df_name}.parquet'
+    # Typed Arrow table of the batch, fails before anything is written if it does not fit the schema
+    table = to_table(df_current,df_name)
+    if not first_run:
+        try:
+            # Try reading the existing Parquet file (cast in case it was written before the typed schema)
+            existing = conform(pq.read_table(p_path),SCHEMAS[df_name],df_name)
+            # Append the new data to the existing table
+            table = pa.concat_tables([existing,table])
+        except FileNotFoundError:
+            # If the file doesn't exist, only write the new data
+            pass
 
-def main(path,first_run):
-    print('starting')
-    df_clean = pd.read_json(path)
-    userArea = pd.json_normalize(df_clean['UserArea'],sep='_')
-    df_clean = df_clean.join(userArea)
-    locations = sub_object_json_extractor(df=df_clean,json_col='PositionLocation',columns_to_keep=['LocationName', 'CountryCode', 'CountrySubDivisionCode', 'CityName', 'Longitude', 'Latitude'])
-    job_category = sub_object_json_extractor(df=df_clean,json_col='JobCategory',columns_to_keep=['Name', 'Code'])
-    df_clean = remuneration_extractor(df=df_clean)
-    df_clean['date_col'] = pd.to_datetime(df_clean['PublicationStartDate']).dt.date
-    duties = df_clean[['PositionID','Details_MajorDuties']].explode('Details_MajorDuties')
+    # Write the combined table back to the Parquet file
+    write_table(table,p_path)
+    return len(table)
+
+
+def normalize(df_clean,salary_factors=None):
+    rows = len(df_clean)
+    with stage('user_area',rows) as s:
+        userArea = pd.json_normalize(df_clean['UserArea'],sep='_')
+        df_clean = df_clean.join(userArea)
+        s.rows_out = len(userArea)
+    with stage('locations',rows) as s:
+        locations = sub_object_json_extractor(df=df_clean,json_col='PositionLocation',columns_to_keep=['LocationName', 'CountryCode', 'CountrySubDivisionCode', 'CityName', 'Longitude', 'Latitude'])
+        s.rows_out = len(locations)
+    with stage('job_category',rows) as s:
+        job_category = sub_object_json_extractor(df=df_clean,json_col='JobCategory',columns_to_keep=['Name', 'Code'])
+        s.rows_out = len(job_category)
+    with stage('remuneration',rows) as s:
+        df_clean = remuneration_extractor(df=df_clean,**(salary_factors or {}))
+        df_clean['date_col'] = pd.to_datetime(df_clean['PublicationStartDate']).dt.date
+        s.rows_out = len(df_clean)
+    with stage('duties',rows) as s:
+        duties = flatten_list_column(df_clean,'PositionID','Details_MajorDuties')
+        s.rows_out = len(duties)
     jobs = df_clean.drop(['UserArea','PositionLocation','JobCategory','Details_MajorDuties','MinimumRange','MaximumRange','RateIntervalCode','PublicationStartDate','PositionRemuneration'],axis=1)
-    write_to_parquet(jobs,duties,locations,job_category,first_run)
+    return jobs,duties,locations,job_category
+
+
+def normalize_stage(df_clean,salary_factors=None,**fields):
+    # normalize() timed as a whole, its steps are nested stages
+    with stage('normalize',len(df_clean),**fields) as s:
+        tables = normalize(df_clean,salary_factors)
+        s.rows_out = sum(len(t) for t in tables)
+    return tables
+
+
+def write_stage(writer,tables,**fields):
+    rows = sum(len(t) for t in tables.values())
+    with stage('write',rows,**fields) as s:
+        writer.write(tables)
+        s.rows_out = rows
+
+
+def summaries_stage(first_run,dates):
+    # Refresh the summary tables of query.py for the dates written by this run (all of them on a first run)
+    with stage('summaries',len(dates)):
+        refresh_summaries(DATA_DIR,None if first_run else dates)
+
+
+def close_stage(writer,first_run):
+    # The summaries are refreshed before the writer releases the dataset lock, so a compaction can not start in between
+    with stage('close'):
+        writer.close(lambda: summaries_stage(first_run,writer.dates))
+
+
+def get_writer(first_run,mode):
+    if mode=='append':
+        return DatasetAppendWriter(DATA_DIR,first_run)
+    if mode=='merge':
+        return DatasetMergeWriter(DATA_DIR,first_run)
+    return ParquetStreamWriter(DATA_DIR,first_run)
+
+
+def start_compaction():
+    # Merge the small files of the partitioned dataset in a detached background process
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)),'dataset.py')
+    subprocess.Popen([sys.executable,script,DATA_DIR],start_new_session=True)
+
+
+def stream_main(path,first_run,chunk_size,mode='rewrite',salary_factors=None):
+    # Normalize the merged JSON chunk by chunk and flush each chunk as Arrow record batches
+    writer = get_writer(first_run,mode)
+    try:
+        for chunk,records in enumerate(instrument.stages('read_chunk',iter_json_array(path,chunk_size=chunk_size))):
+            jobs,duties,locations,job_category = normalize_stage(pd.DataFrame(records),salary_factors,chunk=chunk)
+            write_stage(writer,{'jobs':jobs,
+                                'duties':duties,
+                                'locations':locations,
+                                'job_category':job_category},chunk=chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    close_stage(writer,first_run)
+
+
+def normalize_file(path,salary_factors=None):
+    # Runs in a worker process of batch_main, its stages are only recorded with a single worker (no pool)
+    name = os.path.basename(path)
+    with stage('read_json',file=name) as s:
+        df_clean = pd.read_json(path)
+        s.rows_out = len(df_clean)
+    return normalize_stage(df_clean,salary_factors,file=name)
+
+
+def batch_main(paths,first_run,mode='rewrite',workers=None,batch_rows=50000,salary_factors=None):
+    # Normalize the files in a process pool, the tables are written here in file order by a single writer,
+    # so a rewrite copies the existing tables once and merge upserts behave as if the files were ingested one by one
+    writer = get_writer(first_run,mode)
+    buffer = TableBuffer(batch_rows)
+    try:
+        for path,tables in ordered_map(partial(normalize_file,salary_factors=salary_factors),paths,workers):
+            jobs,duties,locations,job_category = tables
+            if buffer.add({'jobs':jobs,
+                           'duties':duties,
+                           'locations':locations,
+                           'job_category':job_category}):
+                tables,files = buffer.pop()
+                write_stage(writer,tables,files=files)
+        if buffer.files:
+            tables,files = buffer.pop()
+            write_stage(writer,tables,files=files)
+    except BaseException:
+        writer.abort()
+        raise
+    close_stage(writer,first_run)
+
+
+def main(path,first_run,stream=False,chunk_size=500,mode='rewrite',compact=False,salary_factors=None,workers=None,batch_rows=50000):
+    print('starting')
+    paths = input_files(path)
+    if not paths:
+        raise FileNotFoundError(f'No JSON files found in {path}')
+    with stage('ingest',mode=mode,stream=stream,files=len(paths)):
+        if paths != [path]:
+            batch_main(paths,first_run,mode,workers,batch_rows,salary_factors)
+        elif stream:
+            stream_main(path,first_run,chunk_size,mode,salary_factors)
+        else:
+            with stage('read_json') as s:
+                df_clean = pd.read_json(path)
+                s.rows_out = len(df_clean)
+            jobs,duties,locations,job_category = normalize_stage(df_clean,salary_factors)
+            write_to_parquet(jobs,duties,locations,job_category,first_run,mode)
+    if compact and mode in ('append','merge'):
+        start_compaction()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process job market data and store in parquet files.")
-    parser.add_argument("path", type=str, help="Path to the JSON file")
+    parser.add_argument("path", type=str, nargs='+',
+                        help="Path to the JSON file, or several files, directories of *.json files or glob patterns to ingest them in parallel")
     parser.add_argument("--first_run",
                         type=bool,
                         default=False,  # Default value if not provided
                         help="Indicate if it's the first run or not (default is False)")
+    parser.add_argument("--stream",
+                        action="store_true",
+                        help="Read the JSON array item by item and write the tables chunk by chunk with bounded memory")
+    parser.add_argument("--chunk_size",
+                        type=int,
+                        default=500,  # One API page
+                        help="Number of postings normalized per chunk in --stream mode (default is 500)")
+    parser.add_argument("--mode",
+                        choices=['rewrite','append','merge'],
+                        default='rewrite',
+                        help="rewrite: one Parquet file per table, rewritten on every run. "
+                             "append: each run adds new files to a dataset partitioned by date_col. "
+                             "merge: like append, but upserts on PositionID so re-ingested postings replace older ones (default is rewrite)")
+    parser.add_argument("--compact",
+                        action="store_true",
+                        help="In append/merge mode, merge small dataset files in a background process after the run")
+    parser.add_argument("--workers",
+                        type=int,
+                        default=None,
+                        help="Processes normalizing the files when several are given (default is the number of CPUs)")
+    parser.add_argument("--batch_rows",
+                        type=int,
+                        default=50000,
+                        help="When several files are given, postings of consecutive files gathered in each write (default is 50000)")
+    parser.add_argument("--hours_per_week",
+                        type=float,
+                        default=HOURS_PER_WEEK,
+                        help=f"Working hours per week used to annualize hourly salaries (default is {HOURS_PER_WEEK})")
+    parser.add_argument("--weeks_per_year",
+                        type=float,
+                        default=WEEKS_PER_YEAR,
+                        help=f"Paid weeks per year used to annualize hourly/daily/weekly salaries (default is {WEEKS_PER_YEAR})")
+    
+    parser.add_argument("--profile",
+                        nargs='?',
+                        const='-',
+                        default=None,
+                        help="Log the wall time, rows in/out and peak memory of each stage as JSON lines, to this file or to stderr")
+    parser.add_argument("--trace",
+                        type=str,
+                        default=None,
+                        help="Also write the stages as a Chrome trace file (chrome://tracing, Perfetto)")
     
     args = parser.parse_args()
+    path = args.path[0] if len(args.path) == 1 else args.path
+    if args.stream and input_files(path) != [path]:
+        parser.error("--stream reads a single JSON file, several files are normalized in parallel instead")
     # Access the value of first_run
-    main(args.path,args.first_run)
+    salary_factors = {'hours_per_week':args.hours_per_week,'weeks_per_year':args.weeks_per_year}
+    if args.profile or args.trace:
+        instrument.enable(args.profile,args.trace)
+    try:
+        main(path,args.first_run,args.stream,args.chunk_size,args.mode,args.compact,salary_factors,args.workers,args.batch_rows)
+    finally:
+        instrument.disable()
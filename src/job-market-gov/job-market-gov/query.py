@@ -0,0 +1,229 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from dataset import PARTITION_COL, dataset_lock, read_dataset
+
+KEY = 'PositionID'
+MEASURE = 'NormalizedMeanSalary'
+# Grouping columns of the salary questions and the table holding them
+DIMENSIONS = {'DepartmentName': 'jobs',
+              'OrganizationName': 'jobs',
+              'CountrySubDivisionCode': 'locations',
+              'Name': 'job_category'}
+# Salary histogram of each dimension, group and day, kept next to the tables (names starting with _ are
+# not read as data). Means and counts from it are exact, quantiles are interpolated within a bin.
+SUMMARY_FILE = '_summary_salary.parquet'
+BIN_WIDTH = 1000
+QUANTILES = [0.25, 0.5, 0.75]
+
+
+def _date(value):
+    return None if value is None else pd.Timestamp(value).date()
+
+
+def open_table(data_dir, df_name):
+    """pyarrow Dataset of one output table, the partitioned dataset (append/merge) or the single file (rewrite)."""
+    if os.path.isdir(os.path.join(data_dir, df_name)):
+        return read_dataset(data_dir, df_name)
+    return ds.dataset(os.path.join(data_dir, f'{df_name}.parquet'), format='parquet')
+
+
+def date_filter(start=None, end=None, dates=None):
+    """Filter expression on date_col: between start and end (inclusive) and/or in dates, None if unbounded."""
+    expr = None
+    for condition in [ds.field(PARTITION_COL) >= pa.scalar(_date(start), pa.date32()) if start is not None else None,
+                      ds.field(PARTITION_COL) <= pa.scalar(_date(end), pa.date32()) if end is not None else None,
+                      ds.field(PARTITION_COL).isin(pa.array(sorted(dates), pa.date32())) if dates is not None else None]:
+        if condition is not None:
+            expr = condition if expr is None else expr & condition
+    return expr
+
+
+def scan(data_dir, df_name, columns=None, start=None, end=None, filter=None, dates=None):
+    """Reads only the given columns of the rows published between start and end (and matching filter).
+
+    Filters are pushed down to the scan: date partitions are pruned and row groups are skipped on their
+    statistics. Child tables of the single file layout have no date_col, their rows are selected by the
+    PositionIDs of the matching jobs. The dataset lock is held during the scan. Returns a pyarrow Table.
+    """
+    with dataset_lock(data_dir):
+        dataset = open_table(data_dir, df_name)
+        expr = date_filter(start, end, dates)
+        if expr is not None and PARTITION_COL not in dataset.schema.names:
+            keys = open_table(data_dir, 'jobs').to_table(columns=[KEY], filter=expr)[KEY]
+            expr = ds.field(KEY).isin(keys.unique())
+        if filter is not None:
+            expr = filter if expr is None else expr & filter
+        return dataset.to_table(columns=columns, filter=expr)
+
+
+def postings_with(data_dir, dimension, measure=MEASURE, start=None, end=None, dates=None, jobs=None):
+    """Salary and publication date of the postings with their value of dimension.
+
+    A posting is counted once per distinct value, e.g. in each state it has locations in.
+    jobs can be given when already read (with PositionID, date_col, measure and the jobs dimensions).
+    """
+    # Both tables are read under the same lock, so no merge changes them in between
+    with dataset_lock(data_dir):
+        if jobs is None:
+            jobs = scan(data_dir, 'jobs', [KEY, PARTITION_COL, measure] + [dimension] * (DIMENSIONS[dimension] == 'jobs'),
+                        start, end, dates=dates).to_pandas()
+        if DIMENSIONS[dimension] == 'jobs':
+            return jobs[[KEY, PARTITION_COL, measure, dimension]]
+        groups = scan(data_dir, DIMENSIONS[dimension], [KEY, dimension], start, end, dates=dates).to_pandas()
+    return groups.drop_duplicates().merge(jobs[[KEY, PARTITION_COL, measure]], on=KEY)
+
+
+def _summarize(data_dir, dates=None):
+    frames = []
+    # The jobs table is read once for all the dimensions
+    jobs = scan(data_dir, 'jobs', [KEY, PARTITION_COL, MEASURE] + [d for d, df_name in DIMENSIONS.items() if df_name == 'jobs'],
+                dates=dates).to_pandas()
+    for dimension in DIMENSIONS:
+        df = postings_with(data_dir, dimension, dates=dates, jobs=jobs)
+        df['salary'] = df[MEASURE].astype(float)
+        df['bin'] = np.floor(df['salary'] / BIN_WIDTH).astype('Int32')
+        summary = (df.groupby([dimension, PARTITION_COL, 'bin'], dropna=False, observed=True)
+                   .agg(postings=(KEY, 'size'), salary_sum=('salary', 'sum'))
+                   .reset_index()
+                   .rename(columns={dimension: 'group'}))
+        summary['group'] = summary['group'].astype(object)
+        summary.insert(0, 'dimension', dimension)
+        frames.append(summary)
+    return pd.concat(frames, ignore_index=True)
+
+
+def refresh_summaries(data_dir, dates=None):
+    """Recomputes the summary rows of the given publication dates (all of them if None) from the tables.
+
+    Only the partitions / row groups of those dates are read, so a daily ingest refreshes in
+    time proportional to the new batch rather than to the history. The tables are read under one
+    hold of the dataset lock.
+    """
+    path = os.path.join(data_dir, SUMMARY_FILE)
+    if not os.path.exists(path):
+        # No summary yet (e.g. tables ingested before summaries existed): build it from all the dates
+        dates = None
+    with dataset_lock(data_dir):
+        fresh = _summarize(data_dir, dates)
+    if dates is not None:
+        kept = pq.read_table(path, filters=~ds.field(PARTITION_COL).isin(pa.array(sorted(dates), pa.date32())))
+        fresh = pd.concat([kept.to_pandas(), fresh], ignore_index=True)
+    table = pa.Table.from_pandas(fresh.sort_values(['dimension', PARTITION_COL], kind='stable'), preserve_index=False)
+    pq.write_table(table.cast(pa.schema([pa.field('dimension', pa.dictionary(pa.int32(), pa.string())),
+                                         pa.field('group', pa.string()),
+                                         pa.field(PARTITION_COL, pa.date32()),
+                                         pa.field('bin', pa.int32()),
+                                         pa.field('postings', pa.int64()),
+                                         pa.field('salary_sum', pa.float64())])),
+                   path + '.tmp', compression='zstd')
+    os.replace(path + '.tmp', path)
+
+
+def _read_summary(data_dir, dimension, start=None, end=None):
+    path = os.path.join(data_dir, SUMMARY_FILE)
+    if not os.path.exists(path):
+        return None
+    expr = ds.field('dimension') == dimension
+    dates = date_filter(start, end)
+    return pq.read_table(path, filters=expr if dates is None else expr & dates).to_pandas()
+
+
+def _histogram_quantiles(bins, counts, quantiles):
+    # Same definition as pandas (linear between the order statistics around q * (n - 1)), each order
+    # statistic being placed evenly within its bin, so the error is below BIN_WIDTH
+    order = np.argsort(bins)
+    bins, counts = bins[order], counts[order]
+    cumulative = np.cumsum(counts)
+
+    def order_statistic(k):
+        at = np.searchsorted(cumulative, k, side='right')
+        return (bins[at] + (k - (cumulative[at] - counts[at]) + .5) / counts[at]) * BIN_WIDTH
+
+    position = np.asarray(quantiles) * (cumulative[-1] - 1)
+    low, high = order_statistic(np.floor(position)), order_statistic(np.ceil(position))
+    return low + (high - low) * (position - np.floor(position))
+
+
+def _columns(quantiles):
+    return [f'q{q * 100:g}' for q in quantiles]
+
+
+def salary_distribution(data_dir, by='DepartmentName', start=None, end=None, quantiles=QUANTILES, exact=False):
+    """Salary distribution (NormalizedMeanSalary) of the postings by department, organization, state or category.
+
+    Answered from the summary table when there is one (quantiles within BIN_WIDTH of the exact ones),
+    from the tables with exact=True. Returns a frame with a row per group: postings, salaries (postings
+    with a salary), mean and the quantiles.
+    """
+    summary = None if exact else _read_summary(data_dir, by, start, end)
+    rows = []
+    if summary is not None:
+        for group, df in summary.groupby('group', dropna=False, sort=True):
+            paid = df.dropna(subset=['bin']).groupby('bin')[['postings', 'salary_sum']].sum()
+            salaries = paid['postings'].sum()
+            rows.append([group, df['postings'].sum(), salaries, paid['salary_sum'].sum() / salaries if salaries else np.nan]
+                        + (list(_histogram_quantiles(paid.index.to_numpy(float), paid['postings'].to_numpy(), quantiles))
+                           if salaries else [np.nan] * len(quantiles)))
+    else:
+        df = postings_with(data_dir, by, start=start, end=end)
+        df[MEASURE] = df[MEASURE].astype(float)
+        for group, values in df.groupby(df[by].astype(object), dropna=False, sort=True)[MEASURE]:
+            salaries = values.count()
+            rows.append([group, len(values), salaries, values.mean()] + list(values.quantile(quantiles)))
+    return pd.DataFrame(rows, columns=[by, 'postings', 'salaries', 'mean'] + _columns(quantiles))
+
+
+def postings_per_day(data_dir, start=None, end=None, by=None, exact=False):
+    """Number of postings published each day, per value of by (a column of DIMENSIONS) if given."""
+    dimension = by or 'DepartmentName'
+    summary = None if exact else _read_summary(data_dir, dimension, start, end)
+    if summary is None:
+        summary = postings_with(data_dir, dimension, start=start, end=end).rename(columns={dimension: 'group'})
+        summary['postings'] = 1
+    counts = summary.groupby([PARTITION_COL] + ['group'] * (by is not None), dropna=False)['postings'].sum().reset_index()
+    return counts.rename(columns={'group': by})
+
+
+def check(data_dir):
+    """Compares the answers from the summary table with exact scans of the tables."""
+    for by in DIMENSIONS:
+        fast = salary_distribution(data_dir, by).set_index(by).sort_index()
+        exact = salary_distribution(data_dir, by, exact=True).set_index(by).sort_index()
+        assert fast.index.equals(exact.index), by
+        assert (fast['postings'] == exact['postings']).all() and (fast['salaries'] == exact['salaries']).all(), by
+        assert np.allclose(fast['mean'], exact['mean'], equal_nan=True), by
+        error = (fast[_columns(QUANTILES)] - exact[_columns(QUANTILES)]).abs().max().max()
+        assert not error > BIN_WIDTH, (by, error)
+        print(f'{by}: {len(fast)} groups match, quantiles within {error:.0f}')
+    fast, exact = postings_per_day(data_dir), postings_per_day(data_dir, exact=True)
+    assert fast.equals(exact)
+    print(f'postings per day: {len(fast)} days match')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the job market tables.")
+    parser.add_argument("data_dir", type=str, help="Path to the data directory (e.g. ./job-market-gov/data/)")
+    parser.add_argument("question", choices=['salary', 'postings', 'refresh', 'check'],
+                        help="salary: salary distribution by --by. postings: postings per day. "
+                             "refresh: rebuild the summary table. check: compare the summary answers with exact scans")
+    parser.add_argument("--by", choices=list(DIMENSIONS), default=None,
+                        help="Grouping column (default is DepartmentName for salary, none for postings)")
+    parser.add_argument("--start", type=str, default=None, help="First publication date, YYYY-MM-DD (default is no bound)")
+    parser.add_argument("--end", type=str, default=None, help="Last publication date, YYYY-MM-DD (default is no bound)")
+    parser.add_argument("--exact", action="store_true", help="Scan the tables instead of using the summary table")
+    args = parser.parse_args()
+
+    pd.set_option('display.width', 200)
+    if args.question == 'salary':
+        print(salary_distribution(args.data_dir, args.by or 'DepartmentName', args.start, args.end, exact=args.exact).to_string(index=False))
+    elif args.question == 'postings':
+        print(postings_per_day(args.data_dir, args.start, args.end, args.by, args.exact).to_string(index=False))
+    elif args.question == 'refresh':
+        refresh_summaries(args.data_dir)
+    else:
+        check(args.data_dir)
@@ -0,0 +1,34 @@
+import numpy as np
+
+HOURS_PER_WEEK = 40
+WEEKS_PER_YEAR = 52
+DAYS_PER_WEEK = 5
+SALARY_COLUMNS = {'MinimumRange': 'NormalizedMinSalary',
+                  'MaximumRange': 'NormalizedMaxSalary'}
+
+
+def rate_factors(hours_per_week=HOURS_PER_WEEK, weeks_per_year=WEEKS_PER_YEAR, days_per_week=DAYS_PER_WEEK):
+    """Returns the multiplier converting an amount of each USAJobs RateIntervalCode to a yearly salary.
+
+    Codes that cannot be annualized (e.g. FB - Fee Basis) are missing and normalize to NaN.
+    """
+    return {
+        'PA': 1,                                # Per Year
+        'SY': 1,                                # School Year
+        'PM': 12,                               # Per Month
+        'BW': weeks_per_year / 2,               # Bi-Weekly
+        'PW': weeks_per_year,                   # Per Week
+        'PD': days_per_week * weeks_per_year,   # Per Day
+        'PH': hours_per_week * weeks_per_year,  # Per Hour
+        'WC': 0,                                # Without Compensation
+    }
+
+
+def normalize_salaries(df, rate_col='RateIntervalCode', **factors):
+    """Annualizes MinimumRange/MaximumRange in one columnar pass.
+
+    Returns a dict of NormalizedMinSalary/NormalizedMaxSalary arrays, positionally aligned with df.
+    """
+    factor = df[rate_col].map(rate_factors(**factors)).to_numpy(dtype=np.float64, na_value=np.nan)
+    return {normalized_col: df[col].to_numpy(dtype=np.float64, na_value=np.nan) * factor
+            for col, normalized_col in SALARY_COLUMNS.items()}
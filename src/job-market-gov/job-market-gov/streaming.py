@@ -0,0 +1,96 @@
+import json
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from schema import SCHEMAS, PARQUET_OPTIONS, ROW_GROUP_SIZE, conform, to_table
+
+
+def iter_json_array(path, chunk_size=500, read_size=1 << 20):
+    """Yields lists of up to chunk_size items from a top level JSON array.
+
+    The file is read in blocks of read_size characters and decoded one item at a time,
+    so only the current block and chunk are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    chunk = []
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = f.read(read_size).lstrip()
+        if not buf.startswith('['):
+            raise ValueError(f'{path} does not contain a JSON array')
+        pos = 1
+        eof = False
+        while True:
+            # Skip separators between items
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                break
+            try:
+                if pos >= len(buf):
+                    raise json.JSONDecodeError('Unexpected end of buffer', buf, pos)
+                item, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # The current item is cut by the block boundary, read more and retry
+                if eof:
+                    raise
+                more = f.read(read_size)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class ParquetStreamWriter:
+    """Writes chunks of the output tables as row groups of one Parquet file per table.
+
+    With first_run=False the row groups of the existing file are copied batch by batch
+    before the new rows, so the existing history is never loaded as a whole (and is cast
+    to the typed schema if it was written before it).
+    """
+
+    def __init__(self, data_dir, first_run):
+        self.data_dir = data_dir
+        self.first_run = first_run
+        self.writers = {}
+        # Publication dates of the new rows, the summaries of query.py are refreshed for them
+        self.dates = set()
+        os.makedirs(data_dir, exist_ok=True)
+
+    def _open(self, df_name):
+        p_path = os.path.join(self.data_dir, f'{df_name}.parquet')
+        schema = SCHEMAS[df_name]
+        writer = pq.ParquetWriter(p_path + '.tmp', schema, **PARQUET_OPTIONS)
+        if not self.first_run and os.path.exists(p_path):
+            for batch in pq.ParquetFile(p_path).iter_batches(batch_size=ROW_GROUP_SIZE):
+                writer.write_table(conform(pa.Table.from_batches([batch]), schema, df_name))
+        self.writers[df_name] = writer
+        return writer
+
+    def write(self, tables):
+        self.dates.update(tables['jobs']['date_col'].dropna().unique())
+        for df_name, df_current in tables.items():
+            writer = self.writers.get(df_name) or self._open(df_name)
+            writer.write_table(to_table(df_current, df_name), row_group_size=ROW_GROUP_SIZE)
+
+    def close(self, before_release=None):
+        # before_release is called once the tables are in place (see DatasetAppendWriter.close)
+        for df_name, writer in self.writers.items():
+            writer.close()
+            p_path = os.path.join(self.data_dir, f'{df_name}.parquet')
+            os.replace(p_path + '.tmp', p_path)
+        self.writers = {}
+        if before_release is not None:
+            before_release()
+
+    def abort(self):
+        # Drop the partial files and leave the existing tables untouched
+        for df_name, writer in self.writers.items():
+            writer.close()
+            os.remove(os.path.join(self.data_dir, f'{df_name}.parquet.tmp'))
+        self.writers = {}
@@ -0,0 +1,136 @@
+import glob
+import os
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from dataset import DatasetAppendWriter, PARTITION_COL, TABLES, key_runs, relock_dataset
+from schema import conform, file_schema, write_table
+
+KEY = 'PositionID'
+INDEX_FILE = '_position_index.parquet'
+
+
+def load_key_index(data_dir):
+    """Returns the persisted PositionID -> date_col index (empty if missing)."""
+    path = os.path.join(data_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return pd.Series(dtype='datetime64[ns]', name=PARTITION_COL, index=pd.Index([], name=KEY, dtype=object))
+    index = pd.read_parquet(path).set_index(KEY)[PARTITION_COL]
+    return pd.to_datetime(index)
+
+
+def save_key_index(index, data_dir):
+    path = os.path.join(data_dir, INDEX_FILE)
+    df = index.dt.date.rename_axis(KEY).reset_index()
+    df.to_parquet(path + '.tmp', engine='pyarrow', index=False)
+    os.replace(path + '.tmp', path)
+
+
+def purge_keys(data_dir, df_name, partition, keys, skip=()):
+    """Removes the rows of the given keys from the files of one partition (except the files named in skip).
+
+    Only the PositionID column is read to find the files that hold the keys, and only those files are rewritten.
+    """
+    value_set = pa.array(list(keys), type=pa.string())
+    partition_dir = os.path.join(data_dir, df_name, f'{PARTITION_COL}={partition.isoformat()}')
+    for path in glob.glob(os.path.join(partition_dir, 'part-*.parquet')):
+        if os.path.basename(path) in skip:
+            continue
+        parquet_file = pq.ParquetFile(path)
+        mask = pc.is_in(parquet_file.read(columns=[KEY])[KEY], value_set=value_set)
+        if not pc.any(mask).as_py():
+            continue
+        kept = parquet_file.read().filter(pc.invert(mask))
+        if kept.num_rows:
+            merge_id = uuid.uuid4().hex[:8]
+            tmp_path = os.path.join(partition_dir, f'.merge-{merge_id}.parquet')
+            write_table(conform(kept, file_schema(df_name, partitioned=True), df_name), tmp_path)
+            os.replace(tmp_path, os.path.join(partition_dir, f'part-merged-{merge_id}-0.parquet'))
+        os.remove(path)
+
+
+def select_children(jobs_keys, kept, child):
+    """Rows of a child table that belong to the jobs rows at the positions kept.
+
+    Child rows come in the order of their parents, at least one per parent (flatten_list_column
+    keeps a row for empty lists), so the n-th run of a key in the child table is the n-th run in
+    jobs. Rows of a parent published twice in a row can not be told apart, those keep one copy of
+    each distinct row. If the child table does not line up with jobs, all the rows of the kept keys
+    are kept.
+    """
+    jobs_runs, jobs_run_keys = key_runs(jobs_keys)
+    child_runs, child_run_keys = key_runs(child[KEY])
+    if len(jobs_run_keys) != len(child_run_keys) or (jobs_run_keys != child_run_keys).any():
+        return child[child[KEY].isin(np.asarray(jobs_keys, dtype=object)[kept])]
+    in_kept = np.isin(child_runs, jobs_runs[kept])
+    selected = child[in_kept]
+    # Runs of several parents (the same posting twice in a row)
+    ambiguous = np.isin(child_runs[in_kept], np.flatnonzero(np.bincount(jobs_runs) > 1))
+    if not ambiguous.any():
+        return selected
+    return pd.concat([selected[~ambiguous], selected[ambiguous].drop_duplicates()]).sort_index(kind='stable')
+
+
+class DatasetMergeWriter(DatasetAppendWriter):
+    """Upserts batches into the partitioned dataset keyed on PositionID.
+
+    The latest publication (date_col) of a posting wins; when a posting is replaced its rows in
+    jobs, duties, locations and job_category are removed together. The new rows are appended as each
+    batch is written and the replaced rows are only removed by close(), so an aborted run removes its
+    files and leaves the dataset and the index as they were. Existing keys are looked up in a persisted
+    PositionID -> date_col index, so only the partitions holding replaced postings are touched.
+    """
+
+    def __init__(self, data_dir, first_run=False):
+        super().__init__(data_dir, first_run)
+        if first_run and os.path.exists(os.path.join(data_dir, INDEX_FILE)):
+            os.remove(os.path.join(data_dir, INDEX_FILE))
+        self.index = load_key_index(data_dir)
+        # (partition, keys, batch) of the replaced rows, removed on close
+        self.purges = []
+        self.batch_files = {}
+
+    def write(self, tables):
+        jobs = tables['jobs']
+        # Within the batch keep the latest publication of each posting (positions in the batch's jobs)
+        kept = pd.to_datetime(jobs[PARTITION_COL]).argsort(kind='stable').to_numpy()
+        kept = kept[~jobs[KEY].iloc[kept].duplicated(keep='last').to_numpy()]
+        jobs = jobs.iloc[kept]
+        dates = pd.to_datetime(jobs[PARTITION_COL])
+        previous = self.index.reindex(jobs[KEY])
+        newer = previous.isna().values | (dates.values >= previous.values)
+        jobs, kept = jobs[newer], kept[newer]
+        if jobs.empty:
+            return
+        replaced = previous[newer].dropna()
+
+        keys = jobs[KEY]
+        batch = {'jobs': jobs}
+        for df_name, df_current in tables.items():
+            if df_name != 'jobs':
+                batch[df_name] = select_children(tables['jobs'][KEY], kept, df_current)
+        written = len(self.written)
+        super().write(batch)
+        self.batch_files[self.batch - 1] = {os.path.basename(path) for path in self.written[written:]}
+        self.dates.update(replaced.dt.date.unique())
+        for partition, replaced_keys in replaced.groupby(replaced.dt.date).groups.items():
+            self.purges.append((partition, replaced_keys, self.batch - 1))
+        self.index = pd.concat([self.index.drop(keys, errors='ignore'),
+                                pd.Series(dates[newer].values, index=pd.Index(keys, name=KEY), name=PARTITION_COL)])
+
+    def close(self, before_release=None):
+        if self.purges:
+            # Purging rewrites and removes files, no reader or compaction may be using them
+            relock_dataset(self.lock, exclusive=True)
+            for partition, keys, batch in self.purges:
+                # The rows written by this batch and the later ones are the current versions
+                skip = set().union(*(files for b, files in self.batch_files.items() if b >= batch))
+                for df_name in TABLES:
+                    purge_keys(self.data_dir, df_name, partition, keys, skip)
+            self.purges = []
+            relock_dataset(self.lock, exclusive=False)
+        save_key_index(self.index, self.data_dir)
+        super().close(before_release)
@@ -12,7 +12,6 @@ MAX_ROWS=10000
 PAGE=1
 
 echo running
-echo '[]' > main.json
 
 # Loop through pages until we reach the max rows or no more results
 echo "Connection to API started"
@@ -32,11 +31,6 @@ while true; do
         | {PositionID, PositionTitle, PositionLocationDisplay, PositionLocation, OrganizationName, DepartmentName, JobCategory, QualificationSummary, PositionRemuneration, PublicationStartDate, UserArea: {Details: {JobSummary: .UserArea.Details.JobSummary, MajorDuties: .UserArea.Details.MajorDuties}}}]' \
         "page_$PAGE.json" > "tmp.json" && mv tmp.json "page_$PAGE.json"
 
-    # Merge the current page data into main.json
-    jq -s 'add' main.json "page_$PAGE.json" > "tmp.json" && mv tmp.json main.json
-    
-    # Remove current page
-    rm page_$PAGE.json
     # Break if result has less than 500 rows
     if [ "$RESULT_COUNT" -lt $ROWS_PER_PAGE ]; then
         break
@@ -48,4 +42,8 @@ while true; do
     PAGE=$((PAGE + 1))
 done
 
+# Merge all pages into main.json once (merging after every page re-reads the growing file)
+jq -s 'add' $(seq -f "page_%g.json" 1 $PAGE) > main.json
+rm page_*.json
+
 echo "Connection to API ended. Long JSON is ready."
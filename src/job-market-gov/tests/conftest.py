@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules are run as scripts from their folders, not installed as a package
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'job-market-gov'))
+sys.path.insert(0, os.path.join(HERE, '..', 'benchmarks'))
@@ -0,0 +1,103 @@
+import json
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import job_listing
+from batch import TableBuffer, input_files, ordered_map
+from dataset import read_dataset
+from schema import SCHEMAS
+from synthetic import write_payload
+
+
+@pytest.fixture
+def payloads(tmp_path):
+    paths = []
+    for seed in range(3):
+        path = str(tmp_path / 'payloads' / f'page-{seed}.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_payload(path, 40, seed=seed)
+        paths.append(path)
+    return paths
+
+
+def ingest(data_dir, monkeypatch, path, **kwargs):
+    monkeypatch.setattr(job_listing, 'DATA_DIR', data_dir)
+    job_listing.main(path, **kwargs)
+
+
+def rows(data_dir, df_name, mode):
+    if mode == 'rewrite':
+        return pq.read_table(os.path.join(data_dir, f'{df_name}.parquet')).to_pylist()
+    return sorted(read_dataset(data_dir, df_name).to_table().to_pylist(), key=lambda r: json.dumps(r, default=str))
+
+
+def test_input_files(tmp_path, payloads):
+    other = tmp_path / 'other.json'
+    other.write_text('[]')
+    (tmp_path / 'payloads' / 'notes.txt').write_text('')
+    payload_dir = str(tmp_path / 'payloads')
+    assert input_files(payload_dir) == payloads
+    assert input_files([str(other), payload_dir, payloads[0]]) == sorted(payloads + [str(other)])
+    assert input_files(str(tmp_path / '*' / 'page-[12].json')) == payloads[1:]
+    assert input_files(str(tmp_path / 'missing.json')) == [str(tmp_path / 'missing.json')]
+    assert input_files(str(tmp_path / 'missing-*.json')) == []
+
+
+@pytest.mark.parametrize('workers', [1, 2, 3])
+def test_ordered_map_keeps_the_order(workers):
+    items = [str(i) for i in range(20)]
+    assert list(ordered_map(int, items, workers, pending=1)) == [(item, int(item)) for item in items]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_ordered_map_raises_worker_errors(workers):
+    results = ordered_map(int, ['1', '2', 'x', '4'], workers)
+    assert next(results) == ('1', 1)
+    with pytest.raises(ValueError):
+        list(results)
+
+
+def test_table_buffer():
+    def tables(jobs, duties):
+        return {'jobs': pd.DataFrame({'PositionID': jobs}), 'duties': pd.DataFrame({'PositionID': duties})}
+
+    buffer = TableBuffer(5)
+    assert not buffer.add(tables(['A', 'B'], ['A']))
+    assert buffer.add(tables(['C', 'D', 'E'], ['C', 'E']))
+    batch, files = buffer.pop()
+    assert files == 2
+    assert batch['jobs']['PositionID'].tolist() == ['A', 'B', 'C', 'D', 'E']
+    assert batch['duties']['PositionID'].tolist() == ['A', 'C', 'E'] and batch['duties'].index.is_unique
+    assert (buffer.tables, buffer.rows, buffer.files) == ({}, 0, 0)
+    # A single file is passed through
+    single = tables(['F'], ['F'])
+    buffer.add(single)
+    batch, files = buffer.pop()
+    assert batch['jobs'] is single['jobs'] and files == 1
+
+
+def test_rewrite_batch_matches_one_file(tmp_path, payloads, monkeypatch):
+    merged = str(tmp_path / 'main.json')
+    items = []
+    for path in payloads:
+        with open(path) as f:
+            items += json.load(f)
+    with open(merged, 'w') as f:
+        json.dump(items, f)
+    single_dir, batch_dir = str(tmp_path / 'single') + os.sep, str(tmp_path / 'batch') + os.sep
+    ingest(single_dir, monkeypatch, merged, first_run=True)
+    ingest(batch_dir, monkeypatch, payloads, first_run=True, workers=2, batch_rows=50)
+    for df_name in SCHEMAS:
+        assert rows(batch_dir, df_name, 'rewrite') == rows(single_dir, df_name, 'rewrite')
+
+
+@pytest.mark.parametrize('mode', ['append', 'merge'])
+def test_dataset_batch_matches_files_one_by_one(tmp_path, payloads, monkeypatch, mode):
+    # The payloads reuse the same PositionIDs, so the merge upserts depend on the file order
+    single_dir, batch_dir = str(tmp_path / 'single') + os.sep, str(tmp_path / 'batch') + os.sep
+    for i, path in enumerate(payloads):
+        ingest(single_dir, monkeypatch, path, first_run=i == 0, mode=mode)
+    ingest(batch_dir, monkeypatch, payloads, first_run=True, mode=mode, workers=2, batch_rows=50)
+    for df_name in SCHEMAS:
+        assert rows(batch_dir, df_name, mode) == rows(single_dir, df_name, mode)
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pytest
+import fetcher
+import job_listing
+from dataset import read_dataset
+from fetcher import UsaJobsFetcher, fetch_and_ingest
+from synthetic import make_posting
+
+
+class StubApi(ThreadingHTTPServer):
+    """Local USAJobs search API serving `postings` in pages.
+
+    failures maps a page to the statuses returned (in order) before the page is served.
+    """
+
+    def __init__(self, postings, failures=None):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.postings = postings
+        self.failures = {page: list(statuses) for page, statuses in (failures or {}).items()}
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/api/search'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections, as the API
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        page, per_page = int(query['page'][0]), int(query['ResultsPerPage'][0])
+        with self.server.lock:
+            self.server.requests.append((page, dict(self.headers)))
+            self.server.connections.add(self.client_address)
+            failures = self.server.failures.get(page)
+            status = failures.pop(0) if failures else 200
+        if status != 200:
+            self.send_response(status)
+            if status == 429:
+                self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        items = self.server.postings[(page - 1) * per_page:page * per_page]
+        body = json.dumps({'SearchResult': {'SearchResultCountAll': len(self.server.postings),
+                                            'SearchResultItems': [{'MatchedObjectDescriptor': p} for p in items]}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(request):
+    rows, failures = getattr(request, 'param', (95, None))
+    rng = np.random.default_rng(0)
+    server = StubApi([make_posting(i, rng, text_size=20) for i in range(rows)], failures)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    # 10 rows per page and at most 50 rows per query, as the 500 and 10,000 of the API
+    monkeypatch.setattr(fetcher, 'ROWS_PER_PAGE', 10)
+    monkeypatch.setattr(fetcher, 'MAX_ROWS', 50)
+
+
+def fetch_all(api, **kwargs):
+    async def collect():
+        return [(page, data) async for page, data in make_fetcher(api, **kwargs).pages()]
+    return asyncio.run(collect())
+
+
+def make_fetcher(api, **kwargs):
+    kwargs = {'concurrency': 3, 'retries': 2, 'backoff': 0.01, 'timeout': 5, **kwargs}
+    return UsaJobsFetcher('me@example.com', 'key', base_url=api.url, **kwargs)
+
+
+def test_pages_up_to_the_row_limit(api):
+    pages = fetch_all(api)
+    assert pages[0][0] == 1
+    # 95 postings but at most 50 rows per query: pages 1 to 5, each requested once
+    assert sorted(page for page, _ in pages) == [1, 2, 3, 4, 5]
+    assert sorted(page for page, _ in api.requests) == [1, 2, 3, 4, 5]
+    ids = [item['MatchedObjectDescriptor']['PositionID'] for _, data in pages for item in data['SearchResult']['SearchResultItems']]
+    assert sorted(ids) == sorted(f'SYN-{i}' for i in range(50))
+    assert all(headers['User-Agent'] == 'me@example.com' and headers['Authorization-Key'] == 'key'
+               for _, headers in api.requests)
+
+
+def test_connections_are_reused(api):
+    fetch_all(api, concurrency=2)
+    # 5 pages over at most one connection per worker
+    assert len(api.requests) == 5
+    assert len(api.connections) <= 2
+
+
+@pytest.mark.parametrize('api', [(25, {2: [503, 429], 3: [500]})], indirect=True)
+def test_retries_429_and_5xx(api):
+    pages = fetch_all(api)
+    assert sorted(page for page, _ in pages) == [1, 2, 3]
+    assert sorted(page for page, _ in api.requests) == [1, 2, 2, 2, 3, 3]
+
+
+@pytest.mark.parametrize('api', [(25, {2: [404]})], indirect=True)
+def test_other_errors_are_not_retried(api):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        fetch_all(api)
+    assert error.value.code == 404
+    assert [page for page, _ in api.requests].count(2) == 1
+
+
+@pytest.mark.parametrize('api', [(25, {3: [503] * 10})], indirect=True)
+def test_gives_up_after_the_retries(api):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        fetch_all(api, retries=2)
+    assert error.value.code == 503
+    assert [page for page, _ in api.requests].count(3) == 3
+
+
+def test_connection_errors_are_retried(api, capsys):
+    api.shutdown()
+    api.server_close()
+    with pytest.raises(urllib.error.URLError):
+        fetch_all(api, retries=1)
+    assert 'Page 1: retry 1' in capsys.readouterr().out
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / 'data') + '/'
+    monkeypatch.setattr(job_listing, 'DATA_DIR', path)
+    return path
+
+
+def test_ingests_every_page(api, data_dir):
+    asyncio.run(fetch_and_ingest(make_fetcher(api), first_run=True, mode='append'))
+    jobs = read_dataset(data_dir, 'jobs').to_table(columns=['PositionID'])
+    assert sorted(jobs['PositionID'].to_pylist()) == sorted(f'SYN-{i}' for i in range(50))
+
+
+@pytest.mark.parametrize('api', [(25, {3: [404]})], indirect=True)
+def test_failed_fetch_removes_the_written_pages(api, data_dir):
+    with pytest.raises(urllib.error.HTTPError):
+        asyncio.run(fetch_and_ingest(make_fetcher(api, concurrency=1), first_run=True, mode='append'))
+    assert read_dataset(data_dir, 'jobs').to_table().num_rows == 0
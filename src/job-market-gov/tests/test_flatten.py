@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bench_flatten import FIELDS, make_parents, reference_flatten, same_frame
+from flatten import first_list_item, flatten_list_column, list_lengths
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_explode_and_json_normalize(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(10):
+        df = make_parents(int(rng.integers(0, 50)), int(rng.integers(1, 6)), rng)
+        expected = reference_flatten(df, 'PositionID', 'PositionLocation', FIELDS)
+        assert same_frame(expected, flatten_list_column(df, 'PositionID', 'PositionLocation', FIELDS))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_scalar_lists_match_explode(seed):
+    rng = np.random.default_rng(seed)
+    df = make_parents(int(rng.integers(0, 50)), 4, rng)
+    df['Duties'] = [None if v is None else [f'duty-{j}' for j in range(len(v))] for v in df['PositionLocation']]
+    expected = df[['PositionID', 'Duties']].explode('Duties')
+    assert same_frame(expected, flatten_list_column(df, 'PositionID', 'Duties'))
+
+
+def test_without_empty_rows():
+    rng = np.random.default_rng(0)
+    df = make_parents(200, 4, rng)
+    expected = reference_flatten(df, 'PositionID', 'PositionLocation', FIELDS)
+    lengths = list_lengths(df['PositionLocation'].tolist())
+    expected = expected[np.repeat(lengths > 0, np.maximum(lengths, 1))]
+    assert same_frame(expected, flatten_list_column(df, 'PositionID', 'PositionLocation', FIELDS, keep_empty=False))
+
+
+def test_first_list_item_is_aligned_with_the_parents():
+    rng = np.random.default_rng(0)
+    df = make_parents(200, 4, rng)
+    expected = pd.json_normalize([v[0] if isinstance(v, list) and v else {} for v in df['PositionLocation']])
+    actual = first_list_item(df, 'PositionLocation', FIELDS)
+    assert actual.index.equals(df.index)
+    assert same_frame(expected.reindex(columns=FIELDS), actual)
@@ -0,0 +1,113 @@
+import json
+import os
+import pytest
+import instrument
+import job_listing
+from instrument import NO_STAGE, stage, stages
+from synthetic import write_payload
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / 'stages.jsonl')
+    yield path
+    instrument.disable()
+
+
+def records(log_path):
+    with open(log_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_disabled_is_a_no_op():
+    assert stage('anything', 10) is NO_STAGE
+    with stage('anything') as s:
+        s.rows_out = 5
+    assert s.rows_out is None
+    items = [[1], [2]]
+    assert stages('read_chunk', items) is items
+
+
+def test_records_nested_stages(log_path):
+    instrument.enable(log_path)
+    with stage('outer', 3, file='a.json') as outer:
+        with stage('inner', 3) as inner:
+            inner.rows_out = 6
+        outer.rows_out = 2
+    instrument.disable()
+    inner, outer = records(log_path)
+    assert inner['stage'] == 'inner' and inner['path'] == 'outer/inner'
+    assert (inner['rows_in'], inner['rows_out']) == (3, 6)
+    assert outer['path'] == 'outer' and outer['file'] == 'a.json'
+    assert (outer['rows_in'], outer['rows_out']) == (3, 2)
+    assert outer['wall_s'] >= inner['wall_s'] >= 0
+    assert 'failed' not in outer
+    if instrument.rss_mb() is not None:
+        assert outer['peak_rss_mb'] >= inner['peak_rss_mb'] > 0
+
+
+def test_failed_stage(log_path):
+    instrument.enable(log_path)
+    with pytest.raises(KeyError):
+        with stage('outer'):
+            with stage('inner'):
+                raise KeyError('boom')
+    # The stack is unwound, a later stage is at the top level again
+    with stage('after'):
+        pass
+    instrument.disable()
+    assert [(r['path'], r.get('failed')) for r in records(log_path)] == [('outer/inner', True), ('outer', True), ('after', None)]
+
+
+def test_chrome_trace(log_path, tmp_path):
+    trace_path = str(tmp_path / 'trace.json')
+    instrument.enable(log_path, trace_path)
+    with stage('outer', 1):
+        with stage('inner'):
+            pass
+    instrument.disable()
+    with open(trace_path) as f:
+        trace = json.load(f)
+    assert trace['displayTimeUnit'] == 'ms'
+    spans = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+    counters = [e for e in trace['traceEvents'] if e['ph'] == 'C']
+    assert [e['name'] for e in spans] == ['inner', 'outer']
+    assert spans[1]['args']['rows_in'] == 1 and 'rows_out' not in spans[1]['args']
+    # The inner span is within the outer one
+    assert spans[1]['ts'] <= spans[0]['ts'] and spans[0]['ts'] + spans[0]['dur'] <= spans[1]['ts'] + spans[1]['dur']
+    assert len(counters) == 2 and all('peak_rss_mb' in e['args'] for e in counters)
+
+
+def test_stages_times_every_chunk(log_path):
+    instrument.enable(log_path)
+    chunks = list(stages('read_chunk', iter([[1, 2], [3]]), file='a.json'))
+    instrument.disable()
+    assert chunks == [[1, 2], [3]]
+    assert [(r['chunk'], r['rows_out'], r['file']) for r in records(log_path)] == [(0, 2, 'a.json'), (1, 1, 'a.json'), (2, 0, 'a.json')]
+
+
+def test_peak_rss():
+    if not instrument.reset_peak_rss():
+        pytest.skip('the peak RSS can not be reset here')
+    base = instrument.peak_rss_mb()
+    block = bytearray(64 * 1024 * 1024)
+    block[::4096] = b'x' * len(block[::4096])
+    assert instrument.peak_rss_mb() >= base + 32
+    del block
+    instrument.reset_peak_rss()
+    assert instrument.peak_rss_mb() < base + 32
+
+
+def test_ingest_stages(tmp_path, log_path, monkeypatch):
+    monkeypatch.setattr(job_listing, 'DATA_DIR', str(tmp_path / 'data') + os.sep)
+    path = str(tmp_path / 'main.json')
+    write_payload(path, 50)
+    instrument.enable(log_path)
+    job_listing.main(path, first_run=True, stream=True, chunk_size=20)
+    instrument.disable()
+    paths = [r['path'] for r in records(log_path)]
+    assert paths[-1] == 'ingest'
+    assert paths.count('ingest/read_chunk') == 4
+    assert paths.count('ingest/normalize') == paths.count('ingest/write') == 3
+    assert 'ingest/normalize/remuneration' in paths and 'ingest/close/summaries' in paths
+    assert sum(r['rows_out'] for r in records(log_path) if r['path'] == 'ingest/read_chunk') == 50
@@ -0,0 +1,84 @@
+import glob
+import os
+import threading
+import pytest
+import job_listing
+import query
+from dataset import compact_dataset, compact_partition, dataset_lock, lock_dataset, unlock_dataset
+from synthetic import write_payload
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / 'data') + os.sep
+    monkeypatch.setattr(job_listing, 'DATA_DIR', path)
+    return path
+
+
+@pytest.mark.parametrize('mode', ['rewrite', 'append', 'merge'])
+def test_incremental_ingest_without_summary(tmp_path, data_dir, mode):
+    first, second = str(tmp_path / 'first.json'), str(tmp_path / 'second.json')
+    write_payload(first, 300, seed=0)
+    write_payload(second, 300, seed=1)
+    job_listing.main(first, first_run=True, mode=mode)
+    # As for tables ingested before the summaries existed
+    os.remove(os.path.join(data_dir, query.SUMMARY_FILE))
+    job_listing.main(second, first_run=False, mode=mode)
+
+    query.check(data_dir)
+    fast = query.salary_distribution(data_dir, 'DepartmentName')
+    exact = query.salary_distribution(data_dir, 'DepartmentName', exact=True)
+    assert fast['postings'].sum() == exact['postings'].sum()
+
+
+def test_scan_waits_for_a_running_compaction(tmp_path, data_dir):
+    for seed in range(2):
+        path = str(tmp_path / f'{seed}.json')
+        write_payload(path, 200, seed=seed)
+        job_listing.main(path, first_run=seed == 0, mode='append')
+    expected = query.scan(data_dir, 'locations', [query.KEY]).num_rows
+
+    result = {}
+    lock = lock_dataset(data_dir, exclusive=True)
+    reader = threading.Thread(target=lambda: result.update(rows=query.scan(data_dir, 'locations', [query.KEY]).num_rows))
+    reader.start()
+    reader.join(0.3)
+    assert reader.is_alive()
+    # The compaction removes the files the reader would have listed
+    for partition_dir in glob.glob(os.path.join(data_dir, 'locations', '*')):
+        compact_partition(partition_dir, 'locations')
+    unlock_dataset(lock)
+    reader.join()
+    assert result['rows'] == expected
+
+
+def test_compaction_skipped_while_reading(tmp_path, data_dir):
+    for seed in range(2):
+        path = str(tmp_path / f'{seed}.json')
+        write_payload(path, 50, seed=seed)
+        job_listing.main(path, first_run=seed == 0, mode='append')
+    files = sorted(glob.glob(os.path.join(data_dir, 'jobs', '*', 'part-*.parquet')))
+    with dataset_lock(data_dir):
+        compact_dataset(data_dir)
+    assert sorted(glob.glob(os.path.join(data_dir, 'jobs', '*', 'part-*.parquet'))) == files
+
+
+@pytest.mark.parametrize('mode', ['append', 'merge'])
+def test_summaries_refreshed_before_the_lock_is_released(tmp_path, data_dir, monkeypatch, mode):
+    locked = []
+    refresh = job_listing.refresh_summaries
+
+    def refresh_and_check(path, dates=None):
+        # A compaction could not start now
+        lock = lock_dataset(path, exclusive=True, wait=False)
+        locked.append(lock is None)
+        if lock is not None:
+            unlock_dataset(lock)
+        refresh(path, dates)
+
+    monkeypatch.setattr(job_listing, 'refresh_summaries', refresh_and_check)
+    for seed in range(2):
+        path = str(tmp_path / f'{seed}.json')
+        write_payload(path, 100, seed=seed)
+        job_listing.main(path, first_run=seed == 0, mode=mode)
+    assert locked == [True, True]
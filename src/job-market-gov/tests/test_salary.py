@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bench_salary import apply_normalized_salaries, make_remuneration
+from job_listing import remuneration_extractor
+from salary import normalize_salaries, rate_factors
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_row_wise_path(seed):
+    df = make_remuneration(1000, seed=seed)
+    legacy = apply_normalized_salaries(df)
+    vectorized = normalize_salaries(df)
+    supported = df['RateIntervalCode'].isin(['PA', 'PH']).to_numpy()
+    for col in vectorized:
+        np.testing.assert_allclose(vectorized[col][supported], legacy[col].to_numpy(dtype=float)[supported])
+
+
+def test_rate_codes():
+    df = pd.DataFrame({'MinimumRange': [10.0] * 10,
+                       'MaximumRange': [20.0] * 9 + [None],
+                       'RateIntervalCode': ['PA', 'SY', 'PM', 'BW', 'PW', 'PD', 'PH', 'WC', 'FB', None]})
+    salaries = normalize_salaries(df)
+    expected = np.array([1, 1, 12, 26, 52, 260, 2080, 0, np.nan, np.nan])
+    np.testing.assert_array_equal(salaries['NormalizedMinSalary'], 10 * expected)
+    np.testing.assert_array_equal(salaries['NormalizedMaxSalary'][:-1], 20 * expected[:-1])
+    assert np.isnan(salaries['NormalizedMaxSalary'][-1])
+
+
+def test_custom_factors():
+    df = pd.DataFrame({'MinimumRange': [10.0, 10.0, 10.0], 'MaximumRange': [10.0, 10.0, 10.0],
+                       'RateIntervalCode': ['PH', 'PD', 'BW']})
+    factors = {'hours_per_week': 37.5, 'weeks_per_year': 48, 'days_per_week': 4}
+    assert rate_factors(**factors)['PH'] == 1800
+    salaries = normalize_salaries(df, **factors)
+    np.testing.assert_array_equal(salaries['NormalizedMinSalary'], [18000, 1920, 240])
+
+
+def test_aligned_with_a_filtered_frame():
+    # Positional, so a frame with a gapped index still lines up with its rows
+    df = make_remuneration(100)
+    filtered = df[df['RateIntervalCode'] == 'PH']
+    salaries = normalize_salaries(filtered)
+    np.testing.assert_allclose(salaries['NormalizedMinSalary'], filtered['MinimumRange'].to_numpy() * 2080)
+
+
+def test_remuneration_extractor():
+    df = pd.DataFrame({'PositionID': ['A', 'B', 'C'],
+                       'PositionRemuneration': [[{'MinimumRange': '20.5', 'MaximumRange': '30.5', 'RateIntervalCode': 'PH'},
+                                                 {'MinimumRange': '1', 'MaximumRange': '2', 'RateIntervalCode': 'PA'}],
+                                                [{'MinimumRange': '50000', 'MaximumRange': '70000', 'RateIntervalCode': 'PA'}],
+                                                []]})
+    df = remuneration_extractor(df, hours_per_week=35)
+    np.testing.assert_array_equal(df['NormalizedMinSalary'], [20.5 * 35 * 52, 50000, np.nan])
+    np.testing.assert_array_equal(df['NormalizedMeanSalary'], [25.5 * 35 * 52, 60000, np.nan])
+    np.testing.assert_array_equal(df['NormalizedRangeSalary'], [10 * 35 * 52, 20000, np.nan])
@@ -0,0 +1,97 @@
+import datetime
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+from dataset import PARTITIONING, read_dataset
+from schema import SCHEMAS, SchemaError, conform, file_schema, migrate, to_table
+
+
+def jobs(**columns):
+    df = pd.DataFrame({'PositionID': ['A', 'B'],
+                       'DepartmentName': ['Department of Defense', 'Department of Defense'],
+                       'NormalizedMinSalary': [50000.0, None],
+                       'date_col': [datetime.date(2025, 7, 1), datetime.date(2025, 7, 2)]})
+    return df.assign(**columns)
+
+
+def test_to_table():
+    table = to_table(jobs(), 'jobs')
+    assert table.schema == SCHEMAS['jobs']
+    # Missing columns are nulls
+    assert table.column('PositionTitle').null_count == 2
+    assert table.column('DepartmentName').to_pylist() == ['Department of Defense'] * 2
+    assert table.column('NormalizedMinSalary').to_pylist() == [50000.0, None]
+
+
+def test_partitioned_table():
+    table = to_table(jobs(), 'jobs', partitioned=True)
+    assert not pa.types.is_dictionary(table.schema.field('DepartmentName').type)
+    assert table.column('date_col').to_pylist() == [datetime.date(2025, 7, 1), datetime.date(2025, 7, 2)]
+    assert 'date_col' not in file_schema('jobs', partitioned=True).names
+    assert 'date_col' not in file_schema('duties', partitioned=True).names
+
+
+def test_salaries_keep_their_cents():
+    salary = 20.5 * 2080 * 7.13
+    table = to_table(jobs(NormalizedMinSalary=[salary, 1234567.89]), 'jobs')
+    assert table.column('NormalizedMinSalary').to_pylist() == [salary, 1234567.89]
+
+
+@pytest.mark.parametrize('columns, message', [
+    ({'Unexpected': 1}, 'unexpected columns'),
+    ({'PositionID': ['A', None]}, 'missing values'),
+    ({'NormalizedMinSalary': ['a lot', None]}, 'can not store'),
+])
+def test_conform_errors(columns, message):
+    with pytest.raises(SchemaError, match=message):
+        to_table(jobs(**columns), 'jobs')
+
+
+def test_conform_errors_on_missing_keys_and_float_overflow():
+    with pytest.raises(SchemaError, match='missing column PositionID'):
+        to_table(jobs().drop(columns='PositionID'), 'jobs')
+    locations = pa.table({'PositionID': ['A', 'B'], 'Longitude': [-77.0, 1e300], 'Latitude': [np.inf, 38.9]})
+    with pytest.raises(SchemaError, match='Longitude: values out of the float range'):
+        conform(locations, SCHEMAS['locations'], 'locations')
+    # Infinities that were already there are not an overflow
+    table = conform(locations.set_column(1, 'Longitude', pa.array([-77.0, -77.1])), SCHEMAS['locations'], 'locations')
+    assert table.column('Latitude').to_pylist()[0] == np.inf
+
+
+def test_migrate(tmp_path):
+    data_dir = str(tmp_path)
+    legacy = {'jobs': jobs(PositionTitle=['Analyst', 'Nurse'], NormalizedMinSalary=[131072.27, 45.5]),
+              'duties': pd.DataFrame({'PositionID': ['A', 'A', 'B'], 'Details_MajorDuties': ['a1', 'a2', None]})}
+    # Single files as written by pandas before the schema
+    for df_name, df in legacy.items():
+        df.to_parquet(os.path.join(data_dir, f'{df_name}.parquet'), index=False)
+    # Dataset parts written without a schema
+    locations = pd.DataFrame({'PositionID': ['A', 'B'], 'CityName': ['Arlington', 'Austin'],
+                              'Longitude': [-77.1, -97.7], 'Latitude': [38.9, 30.3],
+                              'date_col': [datetime.date(2025, 7, 1), datetime.date(2025, 7, 2)]})
+    ds.write_dataset(pa.Table.from_pandas(locations, preserve_index=False), os.path.join(data_dir, 'locations'),
+                     format='parquet', partitioning=PARTITIONING, basename_template='part-legacy-{i}.parquet')
+    assert pq.read_schema(os.path.join(data_dir, 'jobs.parquet')).field('PositionTitle').type == pa.string()
+
+    migrate(data_dir)
+    for df_name, df in legacy.items():
+        table = pq.read_table(os.path.join(data_dir, f'{df_name}.parquet'))
+        assert table.schema == SCHEMAS[df_name]
+        for column in df.columns:
+            assert table.column(column).to_pylist() == df[column].replace({np.nan: None}).tolist()
+    for path in ('date_col=2025-07-01', 'date_col=2025-07-02'):
+        assert pq.read_schema(os.path.join(data_dir, 'locations', path, 'part-legacy-0.parquet')) == \
+            file_schema('locations', partitioned=True)
+    migrated = read_dataset(data_dir, 'locations').to_table().sort_by('PositionID').to_pandas()
+    assert migrated['CityName'].astype(str).tolist() == ['Arlington', 'Austin']
+    np.testing.assert_allclose(migrated['Longitude'], locations['Longitude'], rtol=1e-6)
+    assert migrated['date_col'].tolist() == locations['date_col'].tolist()
+
+    # Migrating again leaves the tables as they are
+    before = pq.read_table(os.path.join(data_dir, 'jobs.parquet'))
+    migrate(data_dir)
+    assert pq.read_table(os.path.join(data_dir, 'jobs.parquet')).equals(before)
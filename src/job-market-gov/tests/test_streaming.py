@@ -0,0 +1,94 @@
+import datetime
+import json
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from streaming import ParquetStreamWriter, iter_json_array
+from synthetic import write_payload
+
+
+def batch(postings):
+    """Tables of a batch from (PositionID, publication day of July 2025) tuples."""
+    jobs = pd.DataFrame({'PositionID': [p for p, _ in postings],
+                         'NormalizedMinSalary': 131072.25,
+                         'date_col': [datetime.date(2025, 7, day) for _, day in postings]})
+    duties = pd.DataFrame({'PositionID': [p for p, _ in postings],
+                           'Details_MajorDuties': [f'duty of {p}' for p, _ in postings]})
+    return {'jobs': jobs, 'duties': duties}
+
+
+def read(data_dir, df_name):
+    return pq.read_table(os.path.join(data_dir, f'{df_name}.parquet')).column('PositionID').to_pylist()
+
+
+@pytest.mark.parametrize('read_size', [1, 7, 100, 1 << 20])
+@pytest.mark.parametrize('chunk_size', [1, 3, 500])
+def test_iter_json_array_matches_json_load(tmp_path, read_size, chunk_size):
+    path = str(tmp_path / 'main.json')
+    write_payload(path, 20, seed=0)
+    with open(path) as f:
+        expected = json.load(f)
+    chunks = list(iter_json_array(path, chunk_size=chunk_size, read_size=read_size))
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert [item for chunk in chunks for item in chunk] == expected
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '[\n1 , "a,]" ,{"b": [2]}\n]'])
+def test_iter_json_array_separators(tmp_path, text):
+    path = tmp_path / 'main.json'
+    path.write_text(text)
+    assert [item for chunk in iter_json_array(str(path), chunk_size=2, read_size=2) for item in chunk] == json.loads(text)
+
+
+@pytest.mark.parametrize('text', ['{"a": 1}', '[1, 2', '[1, {"a": ]'])
+def test_iter_json_array_invalid(tmp_path, text):
+    path = tmp_path / 'main.json'
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), read_size=4))
+
+
+def test_writer_first_run(tmp_path):
+    data_dir = str(tmp_path)
+    writer = ParquetStreamWriter(data_dir, first_run=True)
+    writer.write(batch([('A', 1), ('B', 2)]))
+    writer.write(batch([('C', 2)]))
+    # Nothing replaces the tables before close
+    assert not os.path.exists(os.path.join(data_dir, 'jobs.parquet'))
+    released = []
+    writer.close(lambda: released.append(os.path.exists(os.path.join(data_dir, 'jobs.parquet'))))
+    assert released == [True]
+    assert read(data_dir, 'jobs') == read(data_dir, 'duties') == ['A', 'B', 'C']
+    assert writer.dates == {datetime.date(2025, 7, 1), datetime.date(2025, 7, 2)}
+    jobs = pq.read_table(os.path.join(data_dir, 'jobs.parquet'))
+    assert jobs.column('NormalizedMinSalary').to_pylist() == [131072.25] * 3
+    assert sorted(os.listdir(data_dir)) == ['duties.parquet', 'jobs.parquet']
+
+
+def test_writer_appends_to_existing_tables(tmp_path):
+    data_dir = str(tmp_path)
+    writer = ParquetStreamWriter(data_dir, first_run=True)
+    writer.write(batch([('A', 1)]))
+    writer.close()
+    writer = ParquetStreamWriter(data_dir, first_run=False)
+    writer.write(batch([('B', 2)]))
+    writer.close()
+    assert read(data_dir, 'jobs') == read(data_dir, 'duties') == ['A', 'B']
+    # A first run starts over
+    writer = ParquetStreamWriter(data_dir, first_run=True)
+    writer.write(batch([('C', 3)]))
+    writer.close()
+    assert read(data_dir, 'jobs') == ['C']
+
+
+def test_abort_keeps_the_existing_tables(tmp_path):
+    data_dir = str(tmp_path)
+    writer = ParquetStreamWriter(data_dir, first_run=True)
+    writer.write(batch([('A', 1)]))
+    writer.close()
+    writer = ParquetStreamWriter(data_dir, first_run=False)
+    writer.write(batch([('B', 2)]))
+    writer.abort()
+    assert read(data_dir, 'jobs') == read(data_dir, 'duties') == ['A']
+    assert sorted(os.listdir(data_dir)) == ['duties.parquet', 'jobs.parquet']
@@ -0,0 +1,78 @@
+import datetime
+import pandas as pd
+import pytest
+from dataset import compact_dataset, read_dataset
+from upsert import INDEX_FILE, DatasetMergeWriter, load_key_index
+
+DUTIES = ('PositionID', 'Details_MajorDuties', 'date_col')
+
+
+def batch(postings):
+    """Tables of a batch from (PositionID, publication day of July 2025, duties) tuples."""
+    jobs = pd.DataFrame({'PositionID': [p for p, _, _ in postings],
+                         'DepartmentName': 'Department of Defense',
+                         'date_col': [datetime.date(2025, 7, day) for _, day, _ in postings]})
+    duties = pd.DataFrame([(p, duty) for p, _, p_duties in postings for duty in p_duties],
+                          columns=['PositionID', 'Details_MajorDuties'])
+    return {'jobs': jobs, 'duties': duties}
+
+
+def read(data_dir, df_name, columns=('PositionID', 'date_col')):
+    df = read_dataset(data_dir, df_name).to_table(columns=list(columns)).to_pandas()
+    return sorted(map(tuple, df.astype(str).values))
+
+
+def ingest(data_dir, *batches, first_run=False):
+    writer = DatasetMergeWriter(data_dir, first_run)
+    for tables in batches:
+        writer.write(tables)
+    writer.close()
+
+
+def test_latest_publication_wins(tmp_path):
+    data_dir = str(tmp_path)
+    ingest(data_dir, batch([('A', 1, ['a1']), ('B', 1, ['b1'])]), first_run=True)
+    # A republished on a later day, B again on the same day, then A once more within the same run
+    ingest(data_dir, batch([('A', 2, ['a2']), ('B', 1, ['b2'])]), batch([('A', 3, ['a3'])]))
+    assert read(data_dir, 'jobs') == [('A', '2025-07-03'), ('B', '2025-07-01')]
+    assert read(data_dir, 'duties', DUTIES) == [('A', 'a3', '2025-07-03'), ('B', 'b2', '2025-07-01')]
+    assert load_key_index(data_dir).dt.date.astype(str).to_dict() == {'A': '2025-07-03', 'B': '2025-07-01'}
+
+
+def test_abort_leaves_the_dataset_and_index_unchanged(tmp_path):
+    data_dir = str(tmp_path)
+    ingest(data_dir, batch([('A', 1, ['a1']), ('B', 1, ['b1'])]), first_run=True)
+    jobs, duties = read(data_dir, 'jobs'), read(data_dir, 'duties', DUTIES)
+    index = (tmp_path / INDEX_FILE).read_bytes()
+
+    writer = DatasetMergeWriter(data_dir)
+    writer.write(batch([('A', 2, ['a2']), ('C', 2, ['c2'])]))
+    with pytest.raises(Exception):
+        # A posting without a key fails the schema check
+        writer.write(batch([(None, 3, ['x'])]))
+    writer.abort()
+    assert read(data_dir, 'jobs') == jobs
+    assert read(data_dir, 'duties', DUTIES) == duties
+    assert (tmp_path / INDEX_FILE).read_bytes() == index
+
+
+def test_repeated_child_rows_are_kept(tmp_path):
+    data_dir = str(tmp_path)
+    # The same duty listed twice is two rows; A is also in the batch with an older publication
+    ingest(data_dir, batch([('A', 1, ['old']), ('B', 1, ['b']), ('A', 2, ['same', 'same', 'other'])]), first_run=True)
+    assert read(data_dir, 'duties', DUTIES) == [('A', 'other', '2025-07-02'), ('A', 'same', '2025-07-02'),
+                                                ('A', 'same', '2025-07-02'), ('B', 'b', '2025-07-01')]
+
+
+def test_compaction_skipped_while_writing(tmp_path):
+    data_dir = str(tmp_path)
+    ingest(data_dir, batch([('A', 1, ['a1'])]), batch([('B', 1, ['b1'])]), first_run=True)
+    partition = tmp_path / 'jobs' / 'date_col=2025-07-01'
+    writer = DatasetMergeWriter(data_dir)
+    writer.write(batch([('A', 2, ['a2'])]))
+    compact_dataset(data_dir)
+    assert len(list(partition.glob('part-*.parquet'))) == 2
+    writer.close()
+    compact_dataset(data_dir)
+    assert len(list(partition.glob('part-*.parquet'))) == 1
+    assert read(data_dir, 'jobs') == [('A', '2025-07-02'), ('B', '2025-07-01')]
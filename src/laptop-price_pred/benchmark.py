@@ -0,0 +1,86 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn import tree
+from predictor import Predictor, load_predictor, rename_columns, score_file
+
+
+def notebook_pipeline(laptops):
+    # The tuned decision tree of the notebook, when no exported model is given
+    X = laptops.drop('price', axis=1)
+    categorical = list(X.select_dtypes(include=['object', 'category']).columns)
+    numeric = list(X.select_dtypes(include=['number']).columns)
+    pipeline = Pipeline(steps=[
+        ('preprocessor', ColumnTransformer(transformers=[('cat', OneHotEncoder(), categorical),
+                                                         ('num', StandardScaler(), numeric)])),
+        ('regressor', tree.DecisionTreeRegressor(min_samples_leaf=3, min_samples_split=10, random_state=42))
+    ])
+    return pipeline.fit(X, laptops['price'])
+
+
+def latencies(fn, rows):
+    times = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1e6
+
+
+def throughput(fn, df, repeat):
+    best = min(_timed(fn, df) for _ in range(repeat))
+    return len(df) / best
+
+
+def _timed(fn, df):
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency and throughput of the laptop price predictor against Pipeline.predict.")
+    parser.add_argument("data", type=str, help="CSV of laptops (Kaggle laptop_prices.csv columns)")
+    parser.add_argument("--model", type=str, default=None, help="Exported model directory (default is to fit the notebook's tree on data)")
+    parser.add_argument("--rows", type=int, default=2000, help="Single-row requests timed (default is 2000)")
+    parser.add_argument("--bulk_rows", type=int, default=1000000, help="Rows of the bulk scoring test, data repeated (default is 1000000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Bulk runs, the best one is reported (default is 3)")
+    args = parser.parse_args()
+
+    laptops = rename_columns(pd.read_csv(args.data))
+    predictor = load_predictor(args.model) if args.model else Predictor(notebook_pipeline(laptops))
+    pipeline = predictor.pipeline
+    X = laptops[predictor.features]
+    records = X.to_dict('records')
+    one_row_frames = [X.iloc[[i % len(X)]] for i in range(args.rows)]
+    rows = [records[i % len(X)] for i in range(args.rows)]
+
+    # Same predictions on the whole data
+    expected = pipeline.predict(X)
+    assert np.allclose(predictor.predict(X), expected)
+    assert np.allclose([predictor.predict_one(r) for r in records], expected)
+
+    print(f'single row ({args.rows} requests, microseconds)')
+    for name, fn, inputs in [('Pipeline.predict', pipeline.predict, one_row_frames),
+                             ('Predictor.predict_one', predictor.predict_one, rows)]:
+        t = latencies(fn, inputs)
+        print(f'  {name:<22} mean {t.mean():9.1f}  p50 {np.percentile(t, 50):9.1f}  p99 {np.percentile(t, 99):9.1f}')
+
+    bulk = pd.concat([X] * max(1, args.bulk_rows // len(X)), ignore_index=True)
+    print(f'bulk ({len(bulk)} rows, rows/s)')
+    for name, fn in [('Pipeline.predict', pipeline.predict), ('Predictor.predict', predictor.predict)]:
+        print(f'  {name:<22} {throughput(fn, bulk, args.repeat):12,.0f}')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for ext in ['csv', 'parquet']:
+            src, dst = os.path.join(tmp, f'in.{ext}'), os.path.join(tmp, f'out.{ext}')
+            bulk.to_csv(src, index=False) if ext == 'csv' else bulk.to_parquet(src, index=False)
+            start = time.perf_counter()
+            n = score_file(predictor, src, dst)
+            print(f'  score_file {ext:<11} {n / (time.perf_counter() - start):12,.0f} (read, predict and write)')
@@ -0,0 +1,196 @@
+import math
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.pipeline import Pipeline
+
+
+def _rows(X, indices):
+    return X.iloc[indices] if hasattr(X, 'iloc') else X[indices]
+
+
+def split_pipeline(pipeline):
+    """(preprocessor, final step name, estimator) of a Pipeline, the preprocessor being its other steps."""
+    steps = pipeline.steps
+    return Pipeline(steps[:-1]) if len(steps) > 1 else None, steps[-1][0], steps[-1][1]
+
+
+def split_params(params, final_name):
+    """Splits pipeline parameters into the preprocessor ones and the final estimator ones."""
+    prefix = final_name + '__'
+    estimator = {k[len(prefix):]: v for k, v in params.items() if k.startswith(prefix)}
+    preprocessor = {k: v for k, v in params.items() if not k.startswith(prefix)}
+    return preprocessor, estimator
+
+
+class FoldCache:
+    """Transformed training and test parts of every CV fold, by preprocessor configuration.
+
+    The preprocessor (e.g. the ColumnTransformer of OneHotEncoder + StandardScaler) is fitted once per
+    fold on its training part, then every candidate estimator is fitted on the cached arrays instead of
+    refitting the preprocessing in each pipeline fit. Same results as fitting the whole pipeline.
+    """
+
+    def __init__(self, X, y, splits):
+        self.X, self.y, self.splits = X, np.asarray(y), splits
+        self.folds = {}
+        self.seconds = 0
+
+    def get(self, preprocessor, params=None):
+        params = params or {}
+        key = joblib.hash((preprocessor, sorted(params.items())))
+        if key not in self.folds:
+            start = time.perf_counter()
+            folds = []
+            for train, test in self.splits:
+                X_train, X_test = _rows(self.X, train), _rows(self.X, test)
+                if preprocessor is not None:
+                    fitted = clone(preprocessor).set_params(**params).fit(X_train, self.y[train])
+                    X_train, X_test = fitted.transform(X_train), fitted.transform(X_test)
+                folds.append((X_train, self.y[train], X_test, self.y[test]))
+            self.folds[key] = folds
+            self.seconds += time.perf_counter() - start
+        return self.folds[key]
+
+
+def _fit_and_score(estimator, X_train, y_train, X_test, y_test, scorer, rows=None):
+    if rows is not None:
+        X_train, y_train = X_train[rows], y_train[rows]
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    score = scorer(estimator, X_test, y_test)
+    return score, fit_time, time.perf_counter() - start
+
+
+def evaluate(candidates, cache, scoring, n_jobs=-1, n_resources=None, random_state=None):
+    """Cross validates (pipeline, params) candidates on the cached folds, (candidate, fold) fits in parallel.
+
+    With n_resources, estimators are fitted on that many random rows of each fold's training part
+    (the preprocessor stays fitted on the whole training part). Returns a row per candidate with the
+    scores, fit times and score times of each fold.
+    """
+    rng = np.random.default_rng(random_state)
+    subsamples = {}
+    tasks = []
+    for i, (pipeline, params) in enumerate(candidates):
+        preprocessor, final_name, estimator = split_pipeline(pipeline)
+        preprocessor_params, estimator_params = split_params(params, final_name)
+        scorer = check_scoring(estimator, scoring)
+        for fold, (X_train, y_train, X_test, y_test) in enumerate(cache.get(preprocessor, preprocessor_params)):
+            # Every candidate gets the same rows of a fold
+            if n_resources is not None and n_resources < len(y_train) and fold not in subsamples:
+                subsamples[fold] = np.sort(rng.choice(len(y_train), n_resources, replace=False))
+            tasks.append((i, delayed(_fit_and_score)(clone(estimator).set_params(**estimator_params),
+                                                     X_train, y_train, X_test, y_test, scorer, subsamples.get(fold))))
+    results = Parallel(n_jobs=n_jobs)(task for _, task in tasks)
+    per_candidate = [{'scores': [], 'fit_times': [], 'score_times': []} for _ in candidates]
+    for (i, _), (score, fit_time, score_time) in zip(tasks, results):
+        per_candidate[i]['scores'].append(score)
+        per_candidate[i]['fit_times'].append(fit_time)
+        per_candidate[i]['score_times'].append(score_time)
+    return per_candidate
+
+
+def _result_row(params, result, **fields):
+    row = {'params': params, **fields,
+           'mean_test_score': np.mean(result['scores']), 'std_test_score': np.std(result['scores']),
+           'mean_fit_time': np.mean(result['fit_times']), 'std_fit_time': np.std(result['fit_times']),
+           'mean_score_time': np.mean(result['score_times'])}
+    row.update({f'split{k}_test_score': score for k, score in enumerate(result['scores'])})
+    return row
+
+
+def compare_models(pipelines, X, y, cv=5, scoring=None, n_jobs=-1):
+    """Cross validates several pipelines at once, e.g. {'Linear': linear_pipeline, ...}.
+
+    Pipelines sharing the same preprocessing reuse its fitted folds. Returns a frame with a row per model.
+    """
+    splits = list(check_cv(cv, y, classifier=is_classifier(next(iter(pipelines.values())))).split(X, y))
+    cache = FoldCache(X, y, splits)
+    results = evaluate([(pipeline, {}) for pipeline in pipelines.values()], cache, scoring, n_jobs)
+    return pd.DataFrame([_result_row(None, result, model=name) for name, result in zip(pipelines, results)]).drop(columns='params')
+
+
+class ModelSearch:
+    """Hyperparameter search over a Pipeline, like GridSearchCV with cached per fold preprocessing.
+
+    search='grid' cross validates every candidate of param_grid (same folds, scores and best candidate
+    as GridSearchCV). search='halving' is successive halving: all candidates are first fitted on
+    min_resources training rows per fold, then only the best 1/factor of them go on to factor times
+    more rows, until the last round runs on the whole training parts ('exhaust' picks min_resources so
+    that it does). After fit: best_params_, best_score_, best_estimator_ (the whole pipeline refitted on
+    all of X), results_ (a row per candidate and round with its scores and fit times) and
+    preprocess_time_ (seconds spent fitting the cached preprocessors).
+    """
+
+    def __init__(self, pipeline, param_grid, cv=5, scoring=None, n_jobs=-1, search='grid', factor=3,
+                 min_resources='exhaust', random_state=None, refit=True):
+        self.pipeline = pipeline
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.search = search
+        self.factor = factor
+        self.min_resources = min_resources
+        self.random_state = random_state
+        self.refit = refit
+
+    def _schedule(self, n_candidates, max_resources):
+        if self.search == 'grid':
+            return [None]
+        if self.search != 'halving':
+            raise ValueError(f"search must be 'grid' or 'halving', got {self.search!r}")
+        # Rounds needed to get down to a single candidate, as in HalvingGridSearchCV
+        n_rounds = 1
+        while self.factor ** n_rounds <= n_candidates:
+            n_rounds += 1
+        min_resources = (max_resources // self.factor ** (n_rounds - 1) if self.min_resources == 'exhaust'
+                         else self.min_resources)
+        return [min(max_resources, min_resources * self.factor ** i) for i in range(n_rounds)]
+
+    def fit(self, X, y):
+        start = time.perf_counter()
+        splits = list(check_cv(self.cv, y, classifier=is_classifier(self.pipeline)).split(X, y))
+        cache = FoldCache(X, y, splits)
+        candidates = list(ParameterGrid(self.param_grid))
+        max_resources = min(len(train) for train, _ in splits)
+        rows = []
+        for round_, n_resources in enumerate(self._schedule(len(candidates), max_resources)):
+            results = evaluate([(self.pipeline, params) for params in candidates], cache, self.scoring,
+                               self.n_jobs, n_resources, self.random_state)
+            rows += [_result_row(params, result, iter=round_, n_resources=n_resources or max_resources,
+                                 n_candidates=len(candidates))
+                     for params, result in zip(candidates, results)]
+            # Keep the best 1/factor of the candidates for the next round (stable order on ties)
+            scores = [np.mean(result['scores']) for result in results]
+            keep = max(1, math.ceil(len(candidates) / self.factor))
+            candidates = [candidates[i] for i in sorted(np.argsort(-np.asarray(scores), kind='stable')[:keep])]
+        self.results_ = pd.DataFrame(rows)
+        # Candidates of later rounds rank first, then by score
+        order = self.results_.sort_values(['iter', 'mean_test_score'], ascending=[False, False], kind='stable').index
+        self.results_.loc[order, 'rank_test_score'] = np.arange(1, len(order) + 1)
+        self.results_['rank_test_score'] = self.results_['rank_test_score'].astype(int)
+        self.best_index_ = order[0]
+        self.best_params_ = self.results_.loc[self.best_index_, 'params']
+        self.best_score_ = self.results_.loc[self.best_index_, 'mean_test_score']
+        self.preprocess_time_ = cache.seconds
+        if self.refit:
+            refit_start = time.perf_counter()
+            self.best_estimator_ = clone(self.pipeline).set_params(**self.best_params_).fit(X, y)
+            self.refit_time_ = time.perf_counter() - refit_start
+        self.search_time_ = time.perf_counter() - start
+        return self
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def score(self, X, y):
+        return check_scoring(self.best_estimator_, self.scoring)(self.best_estimator_, X, y)
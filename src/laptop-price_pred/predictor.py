@@ -0,0 +1,345 @@
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import is_regressor
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+# Artifact layout: <model_dir>/v<N>/pipeline.joblib + metadata.json, bump when it changes
+ARTIFACT_FORMAT = 1
+PIPELINE_FILE = 'pipeline.joblib'
+METADATA_FILE = 'metadata.json'
+PREDICTION_COL = 'predicted_price'
+# Column names of the Kaggle CSV, renamed as in the notebook
+RAW_COLUMNS = {
+    'Brand': 'brand',
+    'Processor': 'processor',
+    'RAM (GB)': 'ram_gb',
+    'Storage': 'storage',
+    'GPU': 'gpu',
+    'Screen Size (inch)': 'screen_size_inch',
+    'Resolution': 'resolution',
+    'Battery Life (hours)': 'battery_life_hours',
+    'Weight (kg)': 'weight_kg',
+    'Operating System': 'operating_system',
+    'Price ($)': 'price',
+}
+
+
+def rename_columns(df):
+    return df.rename(columns={k: v for k, v in RAW_COLUMNS.items() if k in df.columns})
+
+
+class CompiledPipeline:
+    """NumPy version of a fitted Pipeline(ColumnTransformer(OneHotEncoder, StandardScaler), regressor).
+
+    The one-hot encoders become category -> output column lookups and the scalers their mean and scale,
+    applied to plain arrays instead of going through the ColumnTransformer and pandas. Linear models
+    (LinearRegression, linear SVR, ...) become a dot product and single rows walk decision trees on their
+    node lists, skipping the input validation of sklearn; otherwise the regressor predicts on the
+    compiled features. Gives the same predictions as pipeline.predict.
+    Raises NotImplementedError for other pipelines.
+    """
+
+    def __init__(self, pipeline):
+        preprocessor, regressor = pipeline[:-1], pipeline[-1]
+        if len(preprocessor) != 1 or not isinstance(preprocessor[0], ColumnTransformer):
+            raise NotImplementedError('Only a ColumnTransformer followed by a regressor can be compiled')
+        features = list(pipeline.feature_names_in_)
+        self.onehot = []  # (column, offset, categories index, ignore unknown)
+        self.numeric = []  # (column, output index, mean, scale)
+        offset = 0
+        for name, transformer, columns in preprocessor[0].transformers_:
+            if transformer == 'drop':
+                continue
+            columns = [features[c] if isinstance(c, (int, np.integer)) else c for c in np.atleast_1d(columns)]
+            if isinstance(transformer, OneHotEncoder):
+                if transformer.drop is not None or transformer.handle_unknown not in ('error', 'ignore') \
+                        or transformer.min_frequency is not None or transformer.max_categories is not None:
+                    raise NotImplementedError(f'OneHotEncoder {name} options cannot be compiled')
+                for column, categories in zip(columns, transformer.categories_):
+                    self.onehot.append((column, offset, pd.Index(categories), transformer.handle_unknown == 'ignore'))
+                    offset += len(categories)
+            elif isinstance(transformer, StandardScaler) or transformer == 'passthrough':
+                scaler = transformer if transformer != 'passthrough' else None
+                for i, column in enumerate(columns):
+                    mean = scaler.mean_[i] if scaler is not None and scaler.with_mean else 0.0
+                    scale = scaler.scale_[i] if scaler is not None and scaler.with_std else 1.0
+                    self.numeric.append((column, offset, float(mean), float(scale)))
+                    offset += 1
+            else:
+                raise NotImplementedError(f'{type(transformer).__name__} cannot be compiled')
+        self.n_features = offset
+        self.numeric_index = np.array([n[1] for n in self.numeric], dtype=np.intp)
+        self.mean = np.array([n[2] for n in self.numeric])
+        self.scale = np.array([n[3] for n in self.numeric])
+        # Per category column, value -> output column, for single rows
+        self.lookups = [(column, {value: offset + i for i, value in enumerate(categories)}, ignore)
+                        for column, offset, categories, ignore in self.onehot]
+
+        self.regressor = regressor
+        self.tree = None
+        self.coef = None
+        if isinstance(regressor, DecisionTreeRegressor) and regressor.n_outputs_ == 1:
+            tree = regressor.tree_
+            # Python lists walk a single row faster than NumPy scalars
+            self.tree = tuple(a.tolist() for a in (tree.children_left, tree.children_right, tree.feature,
+                                                   tree.threshold, tree.value[:, 0, 0]))
+        elif is_regressor(regressor) and hasattr(regressor, 'coef_') and np.size(regressor.intercept_) == 1:
+            coef = regressor.coef_
+            # SVR fitted on the sparse one-hot output has a sparse coef_
+            self.coef = np.ravel(coef.toarray() if hasattr(coef, 'toarray') else coef).astype(float)
+            self.intercept = float(np.ravel(regressor.intercept_)[0])
+
+    def transform(self, df, dtype=np.float64):
+        """Features of a DataFrame, as the ColumnTransformer would make them (dense)."""
+        X = np.zeros((len(df), self.n_features), dtype=dtype)
+        rows = np.arange(len(df))
+        for column, offset, categories, ignore in self.onehot:
+            codes = categories.get_indexer(df[column])
+            unknown = codes < 0
+            if unknown.any():
+                if not ignore:
+                    raise ValueError(f'Unknown {column}: {df[column][unknown].iloc[0]!r}')
+                X[rows[~unknown], offset + codes[~unknown]] = 1
+            else:
+                X[rows, offset + codes] = 1
+        if self.numeric:
+            X[:, self.numeric_index] = (df[[n[0] for n in self.numeric]].to_numpy(dtype=float) - self.mean) / self.scale
+        return X
+
+    def transform_one(self, row):
+        """Features of one row given as a dict, as a list."""
+        x = [0.0] * self.n_features
+        for column, lookup, ignore in self.lookups:
+            index = lookup.get(row[column])
+            if index is None:
+                if not ignore:
+                    raise ValueError(f'Unknown {column}: {row[column]!r}')
+            else:
+                x[index] = 1.0
+        for column, index, mean, scale in self.numeric:
+            x[index] = (float(row[column]) - mean) / scale
+        return x
+
+    def predict(self, df):
+        if self.coef is not None:
+            return self.transform(df) @ self.coef + self.intercept
+        # Bulk tree predictions are left to the compiled sklearn code, which reads float32 features
+        return self.regressor.predict(self.transform(df, np.float32 if self.tree is not None else np.float64))
+
+    def predict_one(self, row):
+        x = self.transform_one(row)
+        if self.tree is not None:
+            left, right, feature, threshold, value = self.tree
+            # Trees compare float32 features, like DecisionTreeRegressor.predict
+            x = np.array(x, dtype=np.float32).tolist()
+            node = 0
+            while left[node] != -1:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            return value[node]
+        if self.coef is not None:
+            return float(np.dot(self.coef, x) + self.intercept)
+        return float(self.regressor.predict(np.array([x]))[0])
+
+
+class Predictor:
+    """Laptop price predictions of an exported pipeline, through the compiled fast path when possible."""
+
+    def __init__(self, pipeline, metadata=None):
+        self.pipeline = pipeline
+        self.metadata = metadata or {}
+        self.features = list(pipeline.feature_names_in_)
+        try:
+            self.compiled = CompiledPipeline(pipeline)
+        except NotImplementedError as e:
+            warnings.warn(f'Using Pipeline.predict: {e}')
+            self.compiled = None
+
+    def predict(self, df):
+        """Vectorized predictions of a DataFrame (Kaggle or notebook column names)."""
+        df = rename_columns(df)
+        missing = [c for c in self.features if c not in df.columns]
+        if missing:
+            raise ValueError(f'Missing columns: {missing}')
+        if self.compiled is not None:
+            return self.compiled.predict(df)
+        return self.pipeline.predict(df[self.features])
+
+    def predict_one(self, row):
+        """Prediction of a single row given as a dict."""
+        row = {RAW_COLUMNS.get(k, k): v for k, v in row.items()}
+        missing = [c for c in self.features if c not in row]
+        if missing:
+            raise ValueError(f'Missing columns: {missing}')
+        if self.compiled is not None:
+            return self.compiled.predict_one(row)
+        return float(self.pipeline.predict(pd.DataFrame([row], columns=self.features))[0])
+
+
+def _versions(model_dir):
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(model_dir)
+                  if name.startswith('v') and name[1:].isdigit() and os.path.exists(os.path.join(model_dir, name, METADATA_FILE)))
+
+
+def export_model(pipeline, model_dir='./models', metrics=None, check_rows=None):
+    """Saves a fitted pipeline as the next version in model_dir (v1, v2, ...) and returns its path.
+
+    With check_rows (e.g. X_test), the compiled fast path is checked against pipeline.predict first.
+    """
+    if check_rows is not None:
+        expected = pipeline.predict(check_rows)
+        try:
+            actual = CompiledPipeline(pipeline).predict(check_rows)
+        except NotImplementedError:
+            actual = expected
+        if not np.allclose(actual, expected):
+            raise ValueError(f'Compiled predictions differ from the pipeline by up to {np.abs(actual - expected).max()}')
+    version = max(_versions(model_dir), default=0) + 1
+    path = os.path.join(model_dir, f'v{version}')
+    tmp = path + '.tmp'
+    os.makedirs(tmp)
+    joblib.dump(pipeline, os.path.join(tmp, PIPELINE_FILE))
+    metadata = {'version': version,
+                'format': ARTIFACT_FORMAT,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'sklearn_version': sklearn.__version__,
+                'features': list(pipeline.feature_names_in_),
+                'regressor': type(pipeline[-1]).__name__,
+                'params': {k: repr(v) for k, v in pipeline[-1].get_params().items()},
+                'metrics': metrics or {}}
+    with open(os.path.join(tmp, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=1)
+    # Written under a temporary name first, so a server never loads a half-written version
+    os.rename(tmp, path)
+    return path
+
+
+def load_predictor(path='./models', version=None):
+    """Predictor of a model directory (its latest version, or the given one) or of a version directory."""
+    if not os.path.exists(os.path.join(path, PIPELINE_FILE)):
+        versions = _versions(path)
+        if not versions:
+            raise FileNotFoundError(f'No exported model in {path}')
+        path = os.path.join(path, f'v{version or versions[-1]}')
+    with open(os.path.join(path, METADATA_FILE)) as f:
+        metadata = json.load(f)
+    if metadata['format'] != ARTIFACT_FORMAT:
+        raise ValueError(f"Artifact format {metadata['format']} is not supported (expected {ARTIFACT_FORMAT})")
+    if metadata['sklearn_version'] != sklearn.__version__:
+        warnings.warn(f"Model exported with scikit-learn {metadata['sklearn_version']}, running {sklearn.__version__}")
+    return Predictor(joblib.load(os.path.join(path, PIPELINE_FILE)), metadata)
+
+
+def _read_chunks(path, chunk_size):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def score_file(predictor, in_path, out_path, chunk_size=100000):
+    """Writes the rows of a CSV/Parquet file with their predicted_price, chunk by chunk. Returns the row count."""
+    rows = 0
+    writer = None
+    tmp = out_path + '.tmp'
+    try:
+        for chunk in _read_chunks(in_path, chunk_size):
+            chunk[PREDICTION_COL] = predictor.predict(chunk)
+            if out_path.endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            else:
+                chunk.to_csv(tmp, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp, out_path)
+    return rows
+
+
+def make_server(predictor, host='127.0.0.1', port=8000):
+    """HTTP API: GET /health returns the model metadata, POST /predict takes a JSON row (object) or rows
+    (array of objects) and returns {"price": ...} or {"prices": [...]}."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, {'status': 'ok', 'model': predictor.metadata})
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self._reply(404, {'error': 'not found'})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if isinstance(body, list):
+                    result = {'prices': predictor.predict(pd.DataFrame(body)).tolist()}
+                else:
+                    result = {'price': predictor.predict_one(body)}
+            except (ValueError, KeyError, TypeError) as e:
+                return self._reply(400, {'error': str(e)})
+            result['version'] = predictor.metadata.get('version')
+            self._reply(200, result)
+
+        def log_message(self, format, *args):
+            # No log line per request
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Laptop price predictions of an exported model.")
+    parser.add_argument("--model", type=str, default='./models', help="Model directory (default is ./models, latest version)")
+    parser.add_argument("--version", type=int, default=None, help="Model version (default is the latest)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    predict = commands.add_parser('predict', help="Predict one laptop given as a JSON object (or - to read it from stdin)")
+    predict.add_argument("row", type=str)
+    score = commands.add_parser('score', help="Add predicted_price to every row of a CSV/Parquet file")
+    score.add_argument("input", type=str)
+    score.add_argument("output", type=str)
+    score.add_argument("--chunk_size", type=int, default=100000, help="Rows scored at a time (default is 100000)")
+    serve = commands.add_parser('serve', help="Serve the HTTP API (GET /health, POST /predict)")
+    serve.add_argument("--host", type=str, default='127.0.0.1', help="Host (default is 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="Port (default is 8000)")
+    args = parser.parse_args()
+
+    predictor = load_predictor(args.model, args.version)
+    if args.command == 'predict':
+        print(predictor.predict_one(json.loads(sys.stdin.read() if args.row == '-' else args.row)))
+    elif args.command == 'score':
+        start = time.perf_counter()
+        rows = score_file(predictor, args.input, args.output, args.chunk_size)
+        print(f'{rows} rows scored in {time.perf_counter() - start:.2f}s')
+    else:
+        server = make_server(predictor, args.host, args.port)
+        print(f"Serving model v{predictor.metadata['version']} on http://{args.host}:{args.port}")
+        server.serve_forever()
@@ -0,0 +1,96 @@
+import resource
+import sys
+import time
+from contextlib import contextmanager
+import numpy as np
+from scipy import sparse
+from sklearn.naive_bayes import GaussianNB
+from sklearn.utils.validation import check_array
+
+
+class SparseGaussianNB(GaussianNB):
+    """GaussianNB fitted and applied on the sparse TF-IDF matrix, without densifying it.
+
+    The class means and variances only need the sums of x and x**2 per class, and the log likelihood
+    expands as sum((x - mean)**2 / var) = x**2 @ (1 / var) - 2 * x @ (mean / var) + sum(mean**2 / var),
+    all computed with sparse products. Same model as GaussianNB on the dense matrix, in memory
+    proportional to the non-zeros rather than to documents x vocabulary.
+    """
+
+    def _check_X(self, X):
+        X = sparse.csr_matrix(check_array(X, accept_sparse='csr', dtype=np.float64))
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f'X has {X.shape[1]} features, but SparseGaussianNB is expecting {self.n_features_in_} features')
+        return X
+
+    def fit(self, X, y):
+        X = sparse.csr_matrix(check_array(X, accept_sparse='csr', dtype=np.float64))
+        self.classes_, labels = np.unique(np.asarray(y), return_inverse=True)
+        self.n_features_in_ = X.shape[1]
+        squares = X.multiply(X).tocsr()
+        # One-hot class membership, so the per class sums are a single sparse product
+        membership = sparse.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))),
+                                       shape=(len(self.classes_), len(labels)))
+        self.class_count_ = np.asarray(membership.sum(axis=1)).ravel()
+        self.theta_ = np.asarray((membership @ X).todense()) / self.class_count_[:, None]
+        self.var_ = np.asarray((membership @ squares).todense()) / self.class_count_[:, None] - self.theta_ ** 2
+        # As in GaussianNB, a share of the largest feature variance is added to every variance
+        mean = np.asarray(X.mean(axis=0)).ravel()
+        self.epsilon_ = self.var_smoothing * (np.asarray(squares.mean(axis=0)).ravel() - mean ** 2).max()
+        self.var_ = np.maximum(self.var_, 0) + self.epsilon_
+        self.class_prior_ = (np.asarray(self.priors, dtype=float) if self.priors is not None
+                             else self.class_count_ / self.class_count_.sum())
+        return self
+
+    def _joint_log_likelihood(self, X):
+        inverse = 1 / self.var_
+        distance = (X.multiply(X) @ inverse.T - 2 * (X @ (self.theta_ * inverse).T)
+                    + (self.theta_ ** 2 * inverse).sum(axis=1))
+        return (np.log(self.class_prior_) - 0.5 * np.log(2 * np.pi * self.var_).sum(axis=1)) - 0.5 * distance
+
+
+def _status_mb(field):
+    # VmRSS/VmHWM of /proc/self/status, None where there is no /proc
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def _reset_peak_rss():
+    # Linux only: writing 5 to clear_refs resets VmHWM to the current RSS
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+@contextmanager
+def track_resources():
+    """Wall time and peak memory (MB of RSS above the start) of the block, e.g. the cross validation of a model.
+
+    Memory is the kernel's peak RSS of this process, reset at the start of the block, so nothing is
+    traced and the times are those of a normal run. Fits in other processes (n_jobs) are not counted.
+    Where the peak can not be reset (not Linux), it is how much the block raised the process peak,
+    0 if it stayed below an earlier one.
+    """
+    usage = {}
+    reset = _reset_peak_rss()
+    base = _status_mb('VmRSS') if reset else _max_rss_mb()
+    start = time.perf_counter()
+    try:
+        yield usage
+    finally:
+        usage['seconds'] = time.perf_counter() - start
+        peak = _status_mb('VmHWM') if reset else _max_rss_mb()
+        usage['peak_mb'] = max(peak - base, 0)
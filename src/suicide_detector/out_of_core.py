@@ -0,0 +1,137 @@
+import argparse
+import resource
+import sys
+import time
+from functools import partial
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.naive_bayes import ComplementNB, MultinomialNB
+from text_preprocessing import TextPreprocessor
+
+CLASSES = np.array([0, 1])
+METRICS = {'accuracy': accuracy_score, 'precision': partial(precision_score, zero_division=0), 'recall': recall_score, 'f1': f1_score}
+
+
+def default_models():
+    return {'ComplementNB': ComplementNB(), 'MultinomialNB': MultinomialNB()}
+
+
+def make_vectorizer(n_features=2 ** 20, ngram_range=(1, 2)):
+    """Stateless TF vectorizer: nothing is fitted, so every chunk is vectorized on its own.
+
+    alternate_sign=False keeps the features non-negative as the naive Bayes models require.
+    """
+    return HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm='l2')
+
+
+def iter_chunks(path, chunk_size=10000):
+    """Yields (texts, labels) chunks of the CSV, labels converted like the notebook (suicide = 1)."""
+    for chunk in pd.read_csv(path, usecols=['text', 'class'], chunksize=chunk_size):
+        chunk = chunk.dropna(subset=['text'])
+        yield chunk['text'], np.where(chunk['class'] == 'suicide', 1, 0)
+
+
+def scores(model, X, y):
+    """The notebook's scoring metrics of a fitted model on X, y."""
+    y_pred = model.predict(X)
+    row = {name: metric(y, y_pred) for name, metric in METRICS.items()}
+    row['roc_auc'] = roc_auc_score(y, model.predict_proba(X)[:, 1]) if len(set(y)) == 2 else np.nan
+    return row
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def train_out_of_core(path, models=None, chunk_size=10000, vectorizer=None, preprocessor=None, test_size=0.2,
+                      max_test=20000, checkpoints=None, seed=42):
+    """Trains models with partial_fit on the whole CSV, one chunk at a time.
+
+    Each chunk is split at random: the test part is added to a held-out set (up to max_test rows,
+    from the first chunks), the rest is first scored by the current models (progressive validation:
+    every training row is predicted before it is learned) and then learned. After the first chunk,
+    each time the training rows double (or at the given checkpoints) and at the end, the models are
+    scored on the held-out set, which gives the learning curve (on the test_rows gathered so far until
+    the held-out set is full). Memory is bounded by the chunk, the held-out set and the models, not by
+    the size of the CSV. With test_size or max_test 0 nothing is held out and the learning curve is empty.
+
+    Returns the fitted models, the progressive validation scores per chunk and the learning curve.
+    """
+    models = models or default_models()
+    vectorizer = vectorizer or make_vectorizer()
+    preprocessor = preprocessor or TextPreprocessor(cache_dir='./.cache')
+    rng = np.random.default_rng(seed)
+    test_X, test_y = [], []
+    test_rows = 0
+    progressive, curve = [], []
+    seen = 0
+    next_checkpoint = 0
+    start = time.perf_counter()
+
+    def evaluate():
+        if not test_rows:
+            return
+        X, y = sparse.vstack(test_X).tocsr(), np.concatenate(test_y)
+        for name, model in models.items():
+            curve.append({'model': name, 'train_rows': seen, 'test_rows': len(y), **scores(model, X, y),
+                          'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb()})
+
+    for chunk, (texts, y) in enumerate(iter_chunks(path, chunk_size)):
+        X = vectorizer.transform(preprocessor.transform(texts))
+        # Once the held-out set is full, whole chunks are learned
+        test = np.zeros(len(y), dtype=bool)
+        test[np.flatnonzero(rng.random(len(y)) < test_size)[:max_test - test_rows]] = True
+        if test.any():
+            test_X.append(X[test])
+            test_y.append(y[test])
+            test_rows += test.sum()
+        X, y = X[~test], y[~test]
+        for name, model in models.items():
+            if seen:
+                progressive.append({'model': name, 'chunk': chunk, 'train_rows': seen, 'rows': len(y), **scores(model, X, y)})
+            model.partial_fit(X, y, classes=CLASSES)
+        seen += len(y)
+        # Score on the held-out set after the first chunk and each time the training rows double,
+        # or when crossing one of the given checkpoints
+        if checkpoints is None:
+            due = seen >= next_checkpoint
+            next_checkpoint = 2 * seen if due else next_checkpoint
+        else:
+            due = any(c <= seen for c in checkpoints)
+            checkpoints = [c for c in checkpoints if c > seen]
+        if due:
+            evaluate()
+    if not curve or curve[-1]['train_rows'] != seen:
+        evaluate()
+    return models, pd.DataFrame(progressive), pd.DataFrame(curve)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the naive Bayes models on the whole Suicide_Detection.csv in bounded memory.")
+    parser.add_argument("path", type=str, nargs='?', default='./Suicide_Detection.csv',
+                        help="Path to the CSV (default is ./Suicide_Detection.csv)")
+    parser.add_argument("--chunk_size", type=int, default=10000, help="Rows read, preprocessed and learned at a time (default is 10000)")
+    parser.add_argument("--n_features", type=int, default=2 ** 20, help="Hashed feature space size (default is 2**20)")
+    parser.add_argument("--ngram_max", type=int, default=2, help="Largest n-gram (default is 2)")
+    parser.add_argument("--test_size", type=float, default=0.2, help="Share of each chunk held out (default is 0.2)")
+    parser.add_argument("--max_test", type=int, default=20000, help="Maximum held-out rows (default is 20000)")
+    parser.add_argument("--cache_dir", type=str, default='./.cache', help="Preprocessed text cache (default is ./.cache)")
+    parser.add_argument("--n_jobs", type=int, default=-1, help="Processes preprocessing new texts (default is -1, all CPUs)")
+    parser.add_argument("--out", type=str, default='learning_curve.csv', help="Learning curve CSV (default is learning_curve.csv)")
+    args = parser.parse_args()
+
+    _, progressive, curve = train_out_of_core(args.path, chunk_size=args.chunk_size,
+                                              vectorizer=make_vectorizer(args.n_features, (1, args.ngram_max)),
+                                              preprocessor=TextPreprocessor(args.cache_dir, args.n_jobs),
+                                              test_size=args.test_size, max_test=args.max_test)
+    pd.set_option('display.width', 200)
+    print(progressive.groupby('model')[list(METRICS) + ['roc_auc']].mean().to_string())
+    if curve.empty:
+        print('no rows held out (--test_size or --max_test is 0), no learning curve')
+    else:
+        print(curve.to_string(index=False))
+        curve.to_csv(args.out, index=False)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Part of the cache keys, bump it when preprocess_text changes so cached outputs are not reused
+VERSION = 1
+
+# Per process: one lemmatizer and the lemma of every word seen so far (the vocabulary is much
+# smaller than the number of tokens, so most lookups skip WordNet)
+_lemmatizer = None
+_lemmas = {}
+# Per process outputs by content key, used when there is no disk cache
+_documents = {}
+
+
+def lemmatize(word):
+    global _lemmatizer
+    lemma = _lemmas.get(word)
+    if lemma is None:
+        if _lemmatizer is None:
+            _lemmatizer = WordNetLemmatizer()
+        lemma = _lemmas[word] = _lemmatizer.lemmatize(word)
+    return lemma
+
+
+def preprocess_text(text):
+    """Tokenizes, lowercases, lemmatizes, and removes non-alphabetic tokens."""
+    return ' '.join([lemmatize(word) for word in word_tokenize(text.lower()) if word.isalpha()])
+
+
+def preprocess_texts(texts):
+    return [preprocess_text(text) for text in texts]
+
+
+def content_key(text):
+    """Cache key of a document: hash of the preprocessing version and the text."""
+    return hashlib.sha256(f'{VERSION}\0{text}'.encode('utf-8')).digest()
+
+
+class DocumentCache:
+    """Preprocessed documents on disk (SQLite) keyed by content_key, shared by processes and sessions."""
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'preprocessed_text.sqlite')
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS documents (key BLOB PRIMARY KEY, text TEXT NOT NULL)')
+
+    @contextmanager
+    def _connect(self):
+        # GridSearchCV(n_jobs=...) workers may write at the same time, wait for the lock instead of failing
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            db.execute('PRAGMA journal_mode=WAL')
+            # Commits (or rolls back) the transaction, the connection itself is closed below
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get_many(self, keys, batch_size=900):
+        found = {}
+        with self._connect() as db:
+            for i in range(0, len(keys), batch_size):
+                batch = keys[i:i + batch_size]
+                found.update(db.execute(f'SELECT key, text FROM documents WHERE key IN ({",".join("?" * len(batch))})',
+                                        batch).fetchall())
+        return found
+
+    def put_many(self, items):
+        with self._connect() as db:
+            db.executemany('INSERT OR IGNORE INTO documents (key, text) VALUES (?, ?)', items)
+
+
+class TextPreprocessor(BaseEstimator, TransformerMixin):
+    """Pipeline step applying preprocess_text to every document, computing each distinct document once.
+
+    Outputs are looked up by content (so every CV fold and grid search candidate reuses them), in
+    cache_dir on disk if given, else in memory for this process. Documents not seen before are
+    preprocessed in n_jobs processes (-1 for all CPUs, None for this process only).
+    """
+
+    def __init__(self, cache_dir=None, n_jobs=None, chunk_size=500):
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+
+    def fit(self, X, y=None):
+        return self
+
+    def _preprocess(self, texts):
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs or 1
+        if n_jobs == 1 or len(texts) <= self.chunk_size:
+            return preprocess_texts(texts)
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        with ProcessPoolExecutor(n_jobs) as pool:
+            return [text for chunk in pool.map(preprocess_texts, chunks) for text in chunk]
+
+    def transform(self, X):
+        texts = list(X)
+        keys = [content_key(text) for text in texts]
+        cache = DocumentCache(self.cache_dir) if self.cache_dir else None
+        found = cache.get_many(list(set(keys))) if cache else {key: _documents[key] for key in set(keys) if key in _documents}
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            computed = dict(zip(missing, self._preprocess(list(missing.values()))))
+            if cache:
+                cache.put_many(computed.items())
+            else:
+                _documents.update(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The dashboard modules import each other as scripts run from their folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'wildfire_dashboard'))
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+from incidents import group_incidents, select_incidents
+from wildfire_data import DATA_PATH, read_data
+
+pytest.importorskip('duckdb')
+
+QUERIES = {
+    'loss': (select_incidents, (['Estimated_Financial_Loss (Billion $)'],)),
+    'causes': (select_incidents, (['Cause', 'Area_Burned (Acres)', 'Injuries', 'Fatalities'],)),
+    'county_codes': (group_incidents, (['county_code'], ['Incidents'])),
+    'counties': (group_incidents, (['county', 'county_code'], ['Area_Burned (Acres)', 'Homes_Destroyed', 'Fatalities',
+                                                               'Estimated_Financial_Loss (Billion $)'])),
+    'cause_years': (group_incidents, (['Cause', 'year'], ['Incidents', 'Injuries'])),
+    'sizes': (group_incidents, (['size_code'], ['Injuries', 'Fatalities'])),
+}
+YEARS = {'all': None, 'range': list(range(2014, 2023)), 'single': [2018], 'none': []}
+
+
+@pytest.fixture(scope='module')
+def filters():
+    cal_fire = read_data(DATA_PATH)
+    return [(county, cause) for county in ['All'] + sorted(cal_fire['county'].unique())
+            for cause in ['All'] + sorted(cal_fire['Cause'].unique())]
+
+
+@pytest.mark.parametrize('years', YEARS)
+@pytest.mark.parametrize('query', QUERIES)
+def test_duckdb_matches_pandas(filters, query, years):
+    # Every county/cause filter, each backend on the processed dataset
+    function, args = QUERIES[query]
+    for county, cause in filters:
+        results = [function(*args, county=county, cause=cause, years=YEARS[years], backend=backend, path=DATA_PATH)
+                   for backend in ['pandas', 'duckdb']]
+        pd.testing.assert_frame_equal(*results, check_dtype=False, check_categorical=False, obj=f'{county}/{cause}')
@@ -1,16 +1,17 @@
 import streamlit as st
-import pandas as pd
+from cube import load_cube
 
 
 st.sidebar.write("Users can select pages to explore specific wildfire trends.")
 
-cal_fire = pd.read_csv('src/wildfire-dashboard/wildfire_dashboard/wildfire_proc.csv')
+# The totals are sums over the whole table, read them from the aggregation cube
+cube = load_cube()
 
-totalAreaBurned = cal_fire['Area_Burned (Acres)'].sum()
-totalFinancialLoss = cal_fire['Estimated_Financial_Loss (Billion $)'].sum()
-totalFatalities = cal_fire['Fatalities'].sum()
-totalInjuries = cal_fire['Injuries'].sum()
-numberOfWildfires = len(cal_fire)
+totalAreaBurned = cube['Area_Burned (Acres)'].sum()
+totalFinancialLoss = cube['Estimated_Financial_Loss (Billion $)'].sum()
+totalFatalities = cube['Fatalities'].sum()
+totalInjuries = cube['Injuries'].sum()
+numberOfWildfires = cube['Incidents'].sum()
 
 
 # Markdown Content
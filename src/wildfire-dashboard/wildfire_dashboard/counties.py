@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# California counties: name, FIPS code and centroid (latitude, longitude), ordered by FIPS
+COUNTIES = [
+    ("Alameda", "06001", 37.6469, -121.8889),
+    ("Alpine", "06003", 38.5946, -119.8226),
+    ("Amador", "06005", 38.4493, -120.6561),
+    ("Butte", "06007", 39.6253, -121.5370),
+    ("Calaveras", "06009", 38.1960, -120.6800),
+    ("Colusa", "06011", 39.1789, -122.2376),
+    ("Contra Costa", "06013", 37.8534, -121.9018),
+    ("Del Norte", "06015", 41.7423, -123.8992),
+    ("El Dorado", "06017", 38.7426, -120.4358),
+    ("Fresno", "06019", 36.9859, -119.2321),
+    ("Glenn", "06021", 39.5913, -122.3933),
+    ("Humboldt", "06023", 40.7450, -123.8695),
+    ("Imperial", "06025", 33.0114, -115.4734),
+    ("Inyo", "06027", 36.5111, -117.4049),
+    ("Kern", "06029", 35.3431, -118.7270),
+    ("Kings", "06031", 36.0758, -119.8155),
+    ("Lake", "06033", 39.1014, -122.7539),
+    ("Lassen", "06035", 40.5882, -120.5889),
+    ("Los Angeles", "06037", 34.3203, -118.2251),
+    ("Madera", "06039", 37.2153, -119.7664),
+    ("Marin", "06041", 38.0717, -122.7214),
+    ("Mariposa", "06043", 37.5200, -119.8626),
+    ("Mendocino", "06045", 39.4363, -123.3911),
+    ("Merced", "06047", 37.1899, -120.7206),
+    ("Modoc", "06049", 41.5911, -120.7242),
+    ("Mono", "06051", 37.9375, -118.8876),
+    ("Monterey", "06053", 36.2070, -121.3542),
+    ("Napa", "06055", 38.5073, -122.3323),
+    ("Nevada", "06057", 39.3284, -120.8136),
+    ("Orange", "06059", 33.7006, -117.7601),
+    ("Placer", "06061", 39.0916, -120.8039),
+    ("Plumas", "06063", 40.0033, -120.8398),
+    ("Riverside", "06065", 33.7436, -115.9936),
+    ("Sacramento", "06067", 38.4747, -121.3542),
+    ("San Benito", "06069", 36.6504, -121.0599),
+    ("San Bernardino", "06071", 34.8404, -116.1831),
+    ("San Diego", "06073", 32.8771, -116.7560),
+    ("San Francisco", "06075", 37.7400, -122.4467),
+    ("San Joaquin", "06077", 37.9176, -121.1710),
+    ("San Luis Obispo", "06079", 35.3793, -120.5433),
+    ("San Mateo", "06081", 37.4142, -122.2566),
+    ("Santa Barbara", "06083", 34.6206, -119.8205),
+    ("Santa Clara", "06085", 37.2259, -121.6989),
+    ("Santa Cruz", "06087", 37.0361, -122.0712),
+    ("Shasta", "06089", 40.7909, -122.1231),
+    ("Sierra", "06091", 39.5765, -120.5233),
+    ("Siskiyou", "06093", 41.5826, -122.5401),
+    ("Solano", "06095", 38.2567, -121.9358),
+    ("Sonoma", "06097", 38.5764, -122.9451),
+    ("Stanislaus", "06099", 37.6032, -120.9370),
+    ("Sutter", "06101", 39.0279, -121.6736),
+    ("Tehama", "06103", 40.0738, -122.2376),
+    ("Trinity", "06105", 40.6501, -123.1524),
+    ("Tulare", "06107", 36.2190, -118.8000),
+    ("Tuolumne", "06109", 38.0291, -119.9741),
+    ("Ventura", "06111", 34.3523, -119.1443),
+    ("Yolo", "06113", 38.7312, -121.9052),
+    ("Yuba", "06115", 39.2885, -121.3999),
+]
+
+# Names used by the source data for some counties
+ALIASES = {
+    "Napa Valley": "Napa",
+}
+
+NAMES = np.array([c[0] for c in COUNTIES])
+FIPS = np.array([c[1] for c in COUNTIES])
+LATITUDE = np.array([c[2] for c in COUNTIES])
+LONGITUDE = np.array([c[3] for c in COUNTIES])
+COUNTY_DTYPE = pd.CategoricalDtype(categories=NAMES)
+
+
+def normalize_name(name):
+    """Canonical county name, e.g. 'Napa Valley County' -> 'Napa'."""
+    name = str(name).strip().removesuffix(' County')
+    return ALIASES.get(name, name)
+
+
+# County name (canonical, alias or lower case) -> integer county code, built once at import
+CODES = {}
+for code, name in enumerate(NAMES):
+    CODES[name] = CODES[name.lower()] = code
+for alias, name in ALIASES.items():
+    CODES[alias] = CODES[alias.lower()] = CODES[name]
+
+
+def county_code(name):
+    """Integer code of a county name, -1 if unknown."""
+    return CODES.get(name, CODES.get(normalize_name(name).lower(), -1))
+
+
+def county_codes(names):
+    """Integer codes of a Series of county names (-1 for unknown), looking up each distinct name once."""
+    names = pd.Series(names).astype('category')
+    # The trailing -1 is picked by the code -1 of missing names
+    codes = np.array([county_code(name) for name in names.cat.categories] + [-1], dtype=np.int8)
+    return codes[names.cat.codes.to_numpy()]
+
+
+def as_county_category(codes):
+    """Categorical of canonical county names from integer codes."""
+    return pd.Categorical.from_codes(codes, dtype=COUNTY_DTYPE)
@@ -0,0 +1,71 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
+from wildfire_data import DATA_PATH, MONTHS, read_data
+
+CUBE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wildfire_cube.parquet')
+
+DIMENSIONS = ['county', 'Cause', 'year', 'month']
+MEASURES = [
+    'Incidents',
+    'Area_Burned (Acres)',
+    'Homes_Destroyed',
+    'Businesses_Destroyed',
+    'Vehicles_Damaged',
+    'Injuries',
+    'Fatalities',
+    'Estimated_Financial_Loss (Billion $)'
+]
+
+
+def build_cube(cal_fire):
+    """Pre-aggregates the incidents by county, cause, year and month.
+
+    Incidents is the number of wildfires of each cell, the other measures are sums.
+    """
+    sums = [m for m in MEASURES if m != 'Incidents']
+    grouped = cal_fire.groupby(DIMENSIONS, observed=True)
+    cube = grouped[sums].sum()
+    cube.insert(0, 'Incidents', grouped.size())
+    return cube.reset_index()[DIMENSIONS + MEASURES]
+
+
+def read_cube(path=CUBE_PATH):
+    cube = pd.read_parquet(path).astype({'county': 'category', 'Cause': 'category'})
+    cube['month'] = pd.Categorical(cube['month'].astype(str), categories=MONTHS, ordered=True)
+    return cube
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load(path, version):
+    return read_cube(path)
+
+
+def load_cube(path=CUBE_PATH):
+    """Returns the aggregation cube, loaded once per process and reloaded when the file changes."""
+    return _load(path, os.path.getmtime(path))
+
+
+def query_cube(cube, by, measures=MEASURES, county='All', cause='All', years=None):
+    """Slices the cube and sums the measures by the given dimensions.
+
+    county/cause filter a single value ('All' keeps every value), years keeps the listed years.
+    """
+    mask = np.ones(len(cube), dtype=bool)
+    if county != 'All':
+        mask &= (cube['county'] == county).to_numpy()
+    if cause != 'All':
+        mask &= (cube['Cause'] == cause).to_numpy()
+    if years is not None:
+        mask &= cube['year'].isin(years).to_numpy()
+    return cube[mask].groupby(by, observed=True)[list(measures)].sum().reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the county x cause x year x month aggregation cube.")
+    parser.add_argument("--data", type=str, default=DATA_PATH, help="Processed incidents file")
+    parser.add_argument("--out", type=str, default=CUBE_PATH, help="Output Parquet file")
+    args = parser.parse_args()
+    build_cube(read_data(args.data)).to_parquet(args.out, index=False)
@@ -0,0 +1,113 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Above this many incidents the distribution charts are drawn from summaries computed here
+# instead of sending every point to plotly/seaborn (0 always uses the summaries)
+SUMMARY_THRESHOLD = int(os.environ.get('WILDFIRE_SUMMARY_THRESHOLD', 10_000))
+KDE_GRIDSIZE = 200  # Points of the KDE curve, as seaborn
+KDE_BINS = 2048  # Bins the values are counted in before smoothing
+
+
+def summarize(n, threshold=None):
+    """Whether a chart of n points should be drawn from summaries."""
+    threshold = SUMMARY_THRESHOLD if threshold is None else threshold
+    return n > threshold
+
+
+def box_stats(groups, values):
+    """Box plot statistics of values by group, as plotly computes them.
+
+    Quartiles are linearly interpolated and the whiskers end at the most extreme values within
+    1.5 IQR of the quartiles. Returns a frame with a row per group: group, n, lowerfence, q1,
+    median, q3, upperfence and mean.
+    """
+    groups = pd.Series(groups).astype('category')
+    codes = groups.cat.codes.to_numpy()
+    values = np.asarray(values, dtype=float)
+    keep = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+
+    # Sort by group then value, so every group is a sorted run starting at starts
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    present, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+
+    def quantile(q):
+        position = starts + (counts - 1) * q
+        low = np.floor(position).astype(int)
+        high = np.ceil(position).astype(int)
+        return values[low] + (values[high] - values[low]) * (position - low)
+
+    q1, median, q3 = quantile(.25), quantile(.5), quantile(.75)
+    iqr = q3 - q1
+    low_limit = np.repeat(q1 - 1.5 * iqr, counts)
+    high_limit = np.repeat(q3 + 1.5 * iqr, counts)
+    return pd.DataFrame({
+        'group': groups.cat.categories[present],
+        'n': counts,
+        'lowerfence': np.minimum.reduceat(np.where(values >= low_limit, values, np.inf), starts),
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'upperfence': np.maximum.reduceat(np.where(values <= high_limit, values, -np.inf), starts),
+        'mean': np.add.reduceat(values, starts) / counts,
+    })
+
+
+def histogram(values, bins=30):
+    """Counts and edges of equal width bins over the range of the values."""
+    values = np.asarray(values, dtype=float)
+    return np.histogram(values[~np.isnan(values)], bins=bins)
+
+
+def kde(values, gridsize=KDE_GRIDSIZE, bins=KDE_BINS):
+    """Gaussian KDE with Scott's bandwidth on the range of the values, like sns.histplot(kde=True).
+
+    The values are first counted in fine bins and the kernels are summed over the bin centers,
+    so the cost depends on gridsize x bins rather than on the number of values.
+    Returns the grid and the density on it.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    grid = np.linspace(values.min(), values.max(), gridsize)
+    bandwidth = values.std(ddof=1) * len(values) ** -.2
+    if not bandwidth > 0:
+        return grid, np.full(gridsize, np.nan)
+    counts, edges = np.histogram(values, bins=bins)
+    centers = ((edges[:-1] + edges[1:]) / 2)[counts > 0]
+    counts = counts[counts > 0]
+    distances = (grid[:, None] - centers[None, :]) / bandwidth
+    density = np.exp(-.5 * distances ** 2) @ counts / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    return grid, density
+
+
+def check(n=100_000, seed=0):
+    """Compares the summaries to numpy's quantiles and seaborn's KDE on skewed random data."""
+    from seaborn.external.kde import gaussian_kde
+    rng = np.random.default_rng(seed)
+    groups = rng.choice(['Arson', 'Human Activity', 'Lightning', 'Unknown'], n)
+    values = rng.lognormal(8, 1.5, n)
+    stats = box_stats(groups, values)
+    for row in stats.itertuples():
+        group = np.sort(values[groups == row.group])
+        q1, median, q3 = np.percentile(group, [25, 50, 75])
+        iqr = q3 - q1
+        assert np.allclose([row.q1, row.median, row.q3], [q1, median, q3])
+        assert row.lowerfence == group[group >= q1 - 1.5 * iqr].min()
+        assert row.upperfence == group[group <= q3 + 1.5 * iqr].max()
+        assert row.n == len(group) and np.isclose(row.mean, group.mean())
+    print(f'box statistics of {len(stats)} groups match')
+
+    for sample in [values, np.log(values), rng.normal(0, 1, n)]:
+        grid, density = kde(sample)
+        exact = gaussian_kde(sample)(grid)
+        print(f'kde max error {np.abs(density - exact).max() / exact.max():.2e} of the peak density')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the box plot and KDE summaries against the full computations.")
+    parser.add_argument("--n", type=int, default=100_000, help="Random values checked (default is 100000)")
+    args = parser.parse_args()
+    check(args.n)
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+import matplotlib.pyplot as plt
+import streamlit as st
+from wildfire_data import data_version
+from cube import CUBE_PATH
+
+# Serialized figures kept by the server, shared by all sessions
+MAX_BYTES = int(os.environ.get('WILDFIRE_FIGURE_CACHE_MB', 64)) * 1024 * 1024
+
+
+class FigureCache:
+    """LRU cache of serialized figures capped by their total size in bytes."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()  # Sessions run in separate threads
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            # A figure larger than the whole cache is not kept
+            if len(value) > self.max_bytes:
+                return
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+@st.cache_resource(show_spinner=False)
+def figure_cache():
+    return FigureCache()
+
+
+def _key(chart_id, filters):
+    # The data version makes a refresh of the dataset or the cube miss every cached figure
+    return (chart_id, tuple(filters), data_version(), os.path.getmtime(CUBE_PATH))
+
+
+def plotly_figure(chart_id, filters, build):
+    """Returns the figure of build() for the given filters as a plotly dict, built only on a cache miss.
+
+    filters must hold every widget value the chart depends on (and nothing else), so unrelated
+    widget changes reuse the cached figure.
+    """
+    cache = figure_cache()
+    key = _key(chart_id, filters)
+    cached = cache.get(key)
+    if cached is None:
+        cached = build().to_json().encode()
+        cache.put(key, cached)
+    return json.loads(cached)
+
+
+def pyplot_png(chart_id, filters, build):
+    """Returns the matplotlib figure of build() rendered as PNG bytes, built only on a cache miss."""
+    cache = figure_cache()
+    key = _key(chart_id, filters)
+    cached = cache.get(key)
+    if cached is None:
+        fig = build()
+        buffer = io.BytesIO()
+        # Same rendering as st.pyplot
+        fig.savefig(buffer, format='png', bbox_inches='tight', dpi=200)
+        plt.close(fig)
+        cached = buffer.getvalue()
+        cache.put(key, cached)
+    return cached
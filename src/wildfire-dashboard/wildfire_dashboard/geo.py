@@ -0,0 +1,132 @@
+import argparse
+import json
+import math
+import os
+import urllib.request
+import streamlit as st
+
+GEOJSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'california_counties.geojson')
+SOURCE_URL = 'https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json'
+CA_STATE_FIPS = '06'
+TOLERANCE = 0.005  # Degrees, roughly 500 m
+PRECISION = 4  # Decimal places kept in the coordinates
+
+
+def _distance(p, a, b):
+    # Distance of p from the segment a-b
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    t = max(0, min(1, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def douglas_peucker(points, tolerance):
+    """Simplifies a polyline, keeping its end points."""
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        max_distance, index = 0, None
+        for i in range(first + 1, last):
+            distance = _distance(points[i], points[first], points[last])
+            if distance > max_distance:
+                max_distance, index = distance, i
+        if index is not None and max_distance > tolerance:
+            keep[index] = True
+            stack += [(first, index), (index, last)]
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _simplify_arc(arc, tolerance):
+    # Shared borders are traversed in opposite directions by the two counties, simplify them in
+    # a canonical direction so both sides get exactly the same vertices
+    if arc[-1] < arc[0] or (arc[-1] == arc[0] and arc[-2] < arc[1]):
+        return douglas_peucker(arc[::-1], tolerance)[::-1]
+    return douglas_peucker(arc, tolerance)
+
+
+def find_junctions(rings):
+    """Vertices where the set of neighbouring vertices differs between occurrences (where borders meet)."""
+    neighbours = {}
+    for ring in rings:
+        points = ring[:-1]
+        for i, p in enumerate(points):
+            neighbours.setdefault(p, set()).add(frozenset((points[i - 1], points[(i + 1) % len(points)])))
+    return {p for p, pairs in neighbours.items() if len(pairs) > 1}
+
+
+def simplify_ring(ring, junctions, tolerance):
+    """Simplifies a closed ring arc by arc between junctions, which are never moved or dropped."""
+    points = ring[:-1]
+    cuts = [i for i, p in enumerate(points) if p in junctions]
+    if not cuts:
+        simplified = _simplify_arc(ring, tolerance)
+    else:
+        points = points[cuts[0]:] + points[:cuts[0]] + [points[cuts[0]]]
+        cuts = [i for i, p in enumerate(points) if p in junctions]
+        simplified = [points[0]]
+        for start, end in zip(cuts, cuts[1:]):
+            simplified += _simplify_arc(points[start:end + 1], tolerance)[1:]
+    # Keep rings that would collapse below a triangle as they are
+    return simplified if len(simplified) >= 4 else ring
+
+
+def _polygons(geometry):
+    return geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+
+
+def build_california_geojson(source=SOURCE_URL, tolerance=TOLERANCE, precision=PRECISION):
+    """Filters a US counties GeoJSON to California and simplifies it preserving shared borders."""
+    if source.startswith('http'):
+        with urllib.request.urlopen(source) as response:
+            counties = json.load(response)
+    else:
+        with open(source) as f:
+            counties = json.load(f)
+    features = [f for f in counties['features'] if str(f['id']).startswith(CA_STATE_FIPS)]
+
+    # Round and drop repeated vertices so shared borders have identical coordinates
+    for feature in features:
+        polygons = []
+        for polygon in _polygons(feature['geometry']):
+            rings = []
+            for ring in polygon:
+                rounded = [tuple(round(c, precision) for c in p[:2]) for p in ring]
+                rings.append([p for i, p in enumerate(rounded) if i == 0 or p != rounded[i - 1]])
+            polygons.append(rings)
+        feature['polygons'] = polygons
+
+    junctions = find_junctions([ring for f in features for polygon in f['polygons'] for ring in polygon])
+    simplified = []
+    for feature in features:
+        polygons = [[[list(p) for p in simplify_ring(ring, junctions, tolerance)] for ring in polygon]
+                    for polygon in feature['polygons']]
+        geometry = ({'type': 'Polygon', 'coordinates': polygons[0]} if len(polygons) == 1
+                    else {'type': 'MultiPolygon', 'coordinates': polygons})
+        simplified.append({'type': 'Feature',
+                           'id': str(feature['id']),
+                           'properties': {'NAME': feature['properties']['NAME']},
+                           'geometry': geometry})
+    return {'type': 'FeatureCollection', 'features': simplified}
+
+
+@st.cache_resource(show_spinner=False)
+def load_california_geojson(path=GEOJSON_PATH):
+    """Returns the bundled California counties geometry, read once per process."""
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the simplified California counties GeoJSON bundled with the dashboard.")
+    parser.add_argument("--source", type=str, default=SOURCE_URL, help="US counties GeoJSON (URL or path) with FIPS feature ids")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help=f"Simplification tolerance in degrees (default is {TOLERANCE}, 0 keeps every vertex)")
+    parser.add_argument("--precision", type=int, default=PRECISION, help=f"Coordinate decimal places (default is {PRECISION})")
+    parser.add_argument("--out", type=str, default=GEOJSON_PATH, help="Output GeoJSON file")
+    args = parser.parse_args()
+    geojson = build_california_geojson(args.source, args.tolerance, args.precision)
+    with open(args.out, 'w') as f:
+        json.dump(geojson, f, separators=(',', ':'))
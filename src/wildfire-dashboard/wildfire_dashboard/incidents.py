@@ -0,0 +1,117 @@
+import functools
+import os
+import pandas as pd
+import streamlit as st
+from wildfire_data import DATA_PATH, data_version, load_data, set_dtypes
+
+# 'pandas' filters the incidents loaded in memory by load_data(), 'duckdb' queries the Parquet
+# dataset in place so only the result of each query is loaded (needs the duckdb package)
+BACKEND = os.environ.get('WILDFIRE_BACKEND', 'pandas')
+BACKENDS = ['pandas', 'duckdb']
+
+
+def _check_backend(backend):
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend!r}, expected one of {BACKENDS}')
+    return backend
+
+
+def _mask(cal_fire, county, cause, years):
+    mask = pd.Series(True, index=cal_fire.index)
+    if county != 'All':
+        mask &= cal_fire['county'] == county
+    if cause != 'All':
+        mask &= cal_fire['Cause'] == cause
+    if years is not None:
+        mask &= cal_fire['year'].isin(years)
+    return mask
+
+
+@st.cache_resource(show_spinner=False)
+def _connection():
+    import duckdb
+    return duckdb.connect()
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _source(path):
+    # Only the published files, not the hidden ones preprocess.py is still writing
+    files = os.path.join(path, 'part-*.parquet').replace("'", "''")
+    return f"read_parquet('{files}')"
+
+
+def _query(sql, params, path):
+    # A cursor per query, the connection is shared by the sessions' threads
+    cursor = _connection().cursor()
+    try:
+        return cursor.execute(sql.format(source=_source(path)), params).df()
+    finally:
+        cursor.close()
+
+
+@functools.lru_cache(maxsize=8)
+def _column_types(path, version):
+    types = _query('DESCRIBE SELECT * FROM {source}', [], path)
+    return dict(types[['column_name', 'column_type']].values)
+
+
+def _where(county, cause, years):
+    conditions, params = ['TRUE'], []
+    if county != 'All':
+        conditions.append('county = ?')
+        params.append(county)
+    if cause != 'All':
+        conditions.append('Cause = ?')
+        params.append(cause)
+    if years is not None:
+        conditions.append('list_contains(?::INTEGER[], year)')
+        params.append([int(y) for y in years])
+    return ' AND '.join(conditions), params
+
+
+def select_incidents(columns, county='All', cause='All', years=None, backend=None, path=DATA_PATH):
+    """Returns the given columns of the incidents matching the filters.
+
+    county/cause filter a single value ('All' keeps every value), years keeps the listed years.
+    """
+    columns = list(columns)
+    if _check_backend(backend) == 'pandas':
+        cal_fire = load_data(path)
+        return cal_fire.loc[_mask(cal_fire, county, cause, years), columns].reset_index(drop=True)
+    where, params = _where(county, cause, years)
+    sql = f"SELECT {', '.join(map(_quote, columns))} FROM {{source}} WHERE {where}"
+    return set_dtypes(_query(sql, params, path))
+
+
+def group_incidents(by, measures, county='All', cause='All', years=None, backend=None, path=DATA_PATH):
+    """Sums the measures of the incidents matching the filters by the given columns.
+
+    Incidents is the number of incidents of each group, like in the cube. Groups are sorted by
+    the grouping columns and rows with a missing grouping value are left out.
+    """
+    by, measures = list(by), list(measures)
+    sums = [m for m in measures if m != 'Incidents']
+    if _check_backend(backend) == 'pandas':
+        cal_fire = load_data(path)
+        grouped = cal_fire[_mask(cal_fire, county, cause, years)].groupby(by, observed=True)
+        result = grouped[sums].sum()
+        result['Incidents'] = grouped.size()
+        return result.reset_index()[by + measures]
+
+    where, params = _where(county, cause, years)
+    where += ''.join(f' AND {_quote(c)} IS NOT NULL' for c in by)
+    # sum() of integers is a 128 bit integer in DuckDB, cast it back to the column's type
+    types = _column_types(path, data_version(path))
+    aggregates = []
+    for m in measures:
+        if m == 'Incidents':
+            aggregates.append('count(*) AS "Incidents"')
+        else:
+            aggregates.append(f'CAST(coalesce(sum({_quote(m)}), 0) AS {types[m]}) AS {_quote(m)}')
+    keys = ', '.join(map(_quote, by))
+    sql = f"SELECT {keys}, {', '.join(aggregates)} FROM {{source}} WHERE {where} GROUP BY {keys} ORDER BY {keys}"
+    return set_dtypes(_query(sql, params, path))
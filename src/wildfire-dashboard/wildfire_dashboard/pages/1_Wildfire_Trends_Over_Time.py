@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+from cube import load_cube, query_cube
+from figures import plotly_figure
 
 st.markdown("""
 # How have wildfires changed over time?
@@ -25,7 +26,7 @@ Explore the trends and changes in wildfire incidents across California, focusing
 This dashboard helps to track **wildfire trends** over time, providing a clearer picture of how wildfires are changing, their seasonal patterns, and the extent of their damage. It’s a powerful tool for understanding the broader implications of these incidents and for informing policy decisions and preparedness strategies.
 """)
 
-cal_fire = pd.read_csv('src/wildfire-dashboard/wildfire_dashboard/wildfire_proc.csv')
+cube = load_cube()
 
 st.title("How have wildfires changed over time?")
 st.markdown("""
@@ -33,9 +34,9 @@ st.markdown("""
             * Toggle between yearly and monthly trends.
             """)
 
-counties = list(cal_fire['county'].unique())
+counties = list(cube['county'].unique())
 counties.insert(0,'All')
-causes = list(cal_fire['Cause'].unique())
+causes = list(cube['Cause'].unique())
 causes.insert(0,'All')
 
 counties_filter = st.selectbox(
@@ -48,37 +49,29 @@ cause_filter = st.selectbox(
     causes
 )
 
-if cause_filter!='All':
-    cal_fire = cal_fire[cal_fire['Cause']==cause_filter]
-
-if counties_filter!='All':
-    cal_fire = cal_fire[cal_fire['county']==counties_filter]
-
-
 #Heatmap: Month-wise frequency of wildfires (seasonal trends).
-cal_fire_month_year = cal_fire[['Incident_ID','year','month']]
+def incidents_heatmap():
+    # Count incidents per Year-Month
+    incident_counts = query_cube(cube, ["year", "month"], ["Incidents"], county=counties_filter, cause=cause_filter)
 
-# Count incidents per Year-Month
-incident_counts = cal_fire_month_year.groupby(["year", "month"]).size().reset_index(name="Count")
+    # Pivot the data for the heatmap (Years as rows, Months as columns)
+    heatmap_data = incident_counts.pivot(index="year", columns="month", values="Incidents").fillna(0)
 
-# Pivot the data for the heatmap (Years as rows, Months as columns)
-heatmap_data = incident_counts.pivot(index="year", columns="month", values="Count").fillna(0)
+    months_of_year_list = [
+        "January", "February", "March", "April", "May", "June",
+        "July", "August", "September", "October", "November", "December"
+    ]
+    years_list = list(range(2014,2024))
+    heatmap_data = heatmap_data.reindex(index=years_list, columns=months_of_year_list, fill_value=0)
 
-months_of_year_list = [
-    "January", "February", "March", "April", "May", "June",
-    "July", "August", "September", "October", "November", "December"
-]
-years_list = list(range(2014,2024))
-heatmap_data = heatmap_data.reindex(index=years_list, columns=months_of_year_list, fill_value=0)
+    return px.imshow(heatmap_data,text_auto=True,
+                     labels=dict(x="Month", y="Year", color="Number of wildfires"),
+                     x=['Jan', 'Feb', 'Mar', 'Apr', 'May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'],
+                     y=['2014', '2015','2016','2017','2018','2019','2020','2021','2022','2023'],
+                     title='Incident Counts by Month and Year'
+                    )
 
-fig = px.imshow(heatmap_data,text_auto=True,
-                labels=dict(x="Month", y="Year", color="Number of wildfires"),
-                x=['Jan', 'Feb', 'Mar', 'Apr', 'May','Jun','Jul','Aug','Sep','Oct','Nov','Dec'],
-                y=['2014', '2015','2016','2017','2018','2019','2020','2021','2022','2023'],
-                title='Incident Counts by Month and Year'
-               )
-
-st.plotly_chart(fig)
+st.plotly_chart(plotly_figure('trends_heatmap', (counties_filter, cause_filter), incidents_heatmap))
 
 
 #Line chart Number of incidents per year (2014–2024).
@@ -88,25 +81,29 @@ if pick_year_month == 'Year':
 elif pick_year_month == 'Month':
     metric = 'month'
 
-month_freq = cal_fire[metric].value_counts().sort_index().reset_index()
-fig = px.line(month_freq, x=metric, y="count", title=f'Number of wildfires per {metric}' )
-fig.update_layout(
-    xaxis_title=pick_year_month,
-    yaxis_title="Number of wildfires"
-)
-st.plotly_chart(fig)
+def incidents_line():
+    month_freq = query_cube(cube, [metric], ["Incidents"], county=counties_filter, cause=cause_filter)
+    fig = px.line(month_freq, x=metric, y="Incidents", title=f'Number of wildfires per {metric}' )
+    fig.update_layout(
+        xaxis_title=pick_year_month,
+        yaxis_title="Number of wildfires"
+    )
+    return fig
 
-#Bar Chart: Area burned per year (in acres).
-cal_fire_year_area_burned = cal_fire[[metric,'Area_Burned (Acres)']]
-
-# Count incidents per Year-Month
-area_burned_per_year = cal_fire_year_area_burned.groupby(metric).sum().reset_index()
+st.plotly_chart(plotly_figure('trends_line', (counties_filter, cause_filter, metric), incidents_line))
 
-fig = px.bar(area_burned_per_year, y='Area_Burned (Acres)', x=metric, text_auto='.2s',
-            title=f"Area Burned (Acres) per {metric}")
-fig.update_layout(
-    xaxis_title=pick_year_month,
-    yaxis_title="Area Burned (Acres)"
-)
-fig.update_traces(textfont_size=12, textangle=0, textposition="outside", cliponaxis=False)
-st.plotly_chart(fig)
\ No newline at end of file
+#Bar Chart: Area burned per year (in acres).
+def area_burned_bar():
+    # Sum area burned per Year/Month
+    area_burned_per_year = query_cube(cube, [metric], ['Area_Burned (Acres)'], county=counties_filter, cause=cause_filter)
+
+    fig = px.bar(area_burned_per_year, y='Area_Burned (Acres)', x=metric, text_auto='.2s',
+                title=f"Area Burned (Acres) per {metric}")
+    fig.update_layout(
+        xaxis_title=pick_year_month,
+        yaxis_title="Area Burned (Acres)"
+    )
+    fig.update_traces(textfont_size=12, textangle=0, textposition="outside", cliponaxis=False)
+    return fig
+
+st.plotly_chart(plotly_figure('trends_area_bar', (counties_filter, cause_filter, metric), area_burned_bar))
@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import seaborn as sns
+from incidents import select_incidents
+from cube import load_cube, query_cube
+from figures import plotly_figure, pyplot_png
+from distributions import histogram, kde, summarize
 
 st.markdown("""
 # Financial Impact of Wildfires: Damages and Losses
@@ -19,9 +22,9 @@ This section of the dashboard provides a detailed look at the **financial impact
 By filtering the data based on the selected location, users can gain insights into the financial consequences of wildfires at both the local and state levels, providing valuable information for future planning and mitigation strategies.
 """)
 
-cal_fire = pd.read_csv('src/wildfire-dashboard/wildfire_dashboard/wildfire_proc.csv')
+cube = load_cube()
 
-counties = list(cal_fire['county'].unique())
+counties = list(cube['county'].unique())
 counties.insert(0,'All')
 
 counties_filter = st.selectbox(
@@ -29,40 +32,51 @@ counties_filter = st.selectbox(
     counties
 )
 
-if counties_filter!='All':
-    cal_fire = cal_fire[cal_fire['county']==counties_filter]
-
 #Stacked Bar Chart: Comparison of homes, businesses, and vehicles damaged per year.
-finance_by_year = cal_fire[['year',
-                            'Homes_Destroyed',
-                            'Businesses_Destroyed',
-                            'Vehicles_Damaged']].groupby('year').sum().reset_index()
-finance_vars = ['Homes_Destroyed','Businesses_Destroyed','Vehicles_Damaged']
-
-# Create figure
-fig = go.Figure()
-
-# Add traces
-fig.add_trace(go.Bar(x=finance_by_year['year'], y=finance_by_year['Homes_Destroyed'], name='Homes_Destroyed'))
-fig.add_trace(go.Bar(x=finance_by_year['year'], y=finance_by_year['Businesses_Destroyed'], name='Businesses_Destroyed'))
-fig.add_trace(go.Bar(x=finance_by_year['year'], y=finance_by_year['Vehicles_Damaged'], name='Vehicles_Damaged'))
-# Update layout
-fig.update_layout(
-    barmode='group',  # Grouped bars
-    title='Grouped Bar Chart',
-    xaxis_title='Year',
-    yaxis_title='Frequency',
-    xaxis=dict(tickmode='linear')
-)
+def damages_bar():
+    finance_vars = ['Homes_Destroyed','Businesses_Destroyed','Vehicles_Damaged']
+    finance_by_year = query_cube(cube, ['year'], finance_vars, county=counties_filter)
+
+    # Create figure
+    fig = go.Figure()
+
+    # Add traces
+    fig.add_trace(go.Bar(x=finance_by_year['year'], y=finance_by_year['Homes_Destroyed'], name='Homes_Destroyed'))
+    fig.add_trace(go.Bar(x=finance_by_year['year'], y=finance_by_year['Businesses_Destroyed'], name='Businesses_Destroyed'))
+    fig.add_trace(go.Bar(x=finance_by_year['year'], y=finance_by_year['Vehicles_Damaged'], name='Vehicles_Damaged'))
+    # Update layout
+    fig.update_layout(
+        barmode='group',  # Grouped bars
+        title='Grouped Bar Chart',
+        xaxis_title='Year',
+        yaxis_title='Frequency',
+        xaxis=dict(tickmode='linear')
+    )
+    return fig
 
 # Show figure
-st.plotly_chart(fig)
-
-fig = plt.figure(figsize=(10, 4))
-sns.histplot(cal_fire['Estimated_Financial_Loss (Billion $)'], bins=30, kde=True, color='skyblue', edgecolor='black')
-
-plt.title('Estimated Financial Loss (Billion $) distribution')
-plt.xlabel('Estimated Financial Loss (Billion $)')
-plt.ylabel('Frequency')
-st.pyplot(fig)
-
+st.plotly_chart(plotly_figure('economic_damages_bar', (counties_filter,), damages_bar))
+
+#Histogram: distribution of the loss of single incidents, read from the incident table
+def loss_histogram():
+    cal_fire = select_incidents(['Estimated_Financial_Loss (Billion $)'], county=counties_filter)
+
+    loss = cal_fire['Estimated_Financial_Loss (Billion $)']
+    fig = plt.figure(figsize=(10, 4))
+    if summarize(len(loss)):
+        # Bin and smooth with numpy, then let seaborn draw the bins from their counts
+        counts, edges = histogram(loss, bins=30)
+        grid, density = kde(loss)
+        ax = sns.histplot(x=(edges[:-1] + edges[1:]) / 2, weights=counts, bins=list(edges), color='skyblue', edgecolor='black')
+        # Scaled to the histogram's area, like histplot's own KDE
+        ax.plot(grid, density * counts.sum() * (edges[1] - edges[0]), color='skyblue')
+    else:
+        sns.histplot(loss, bins=30, kde=True, color='skyblue', edgecolor='black')
+
+    plt.title('Estimated Financial Loss (Billion $) distribution')
+    plt.xlabel('Estimated Financial Loss (Billion $)')
+    plt.ylabel('Frequency')
+    return fig
+
+# Rendered to PNG once per county, like st.pyplot does
+st.image(pyplot_png('economic_loss_hist', (counties_filter,), loss_histogram), use_container_width=True)
@@ -2,8 +2,12 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import numpy as np
 import plotly.graph_objects as go
+from wildfire_data import DATA_PATH
+from incidents import group_incidents
+from sizes import size_labels
+from cube import load_cube, query_cube
+from figures import plotly_figure
 
 # Display Markdown and text
 st.markdown("""
@@ -22,12 +26,11 @@ By filtering the data based on location and wildfire cause, users can tailor the
 """)
 
 
-cal_fire = pd.read_csv('src/wildfire-dashboard/wildfire_dashboard/wildfire_proc.csv')
+cube = load_cube()
 
-
-counties = list(cal_fire['county'].unique())
+counties = list(cube['county'].unique())
 counties.insert(0,'All')
-causes = list(cal_fire['Cause'].unique())
+causes = list(cube['Cause'].unique())
 causes.insert(0,'All')
 
 counties_filter = st.selectbox(
@@ -40,17 +43,9 @@ cause_filter = st.selectbox(
     causes
 )
 
-if cause_filter!='All':
-    cal_fire = cal_fire[cal_fire['Cause']==cause_filter]
-
-if counties_filter!='All':
-    cal_fire = cal_fire[cal_fire['county']==counties_filter]
-
 
 
 #Line chart Sum of Injuries and Fatalities per year (2014–2024).
-year_injury_fatalities = cal_fire[['year','Injuries','Fatalities']].groupby('year').sum().sort_index()
-
 def line_chart_plot(data,col):
     # Create the line chart
     plt.plot(data.index, data[col], marker='o')
@@ -63,55 +58,46 @@ def line_chart_plot(data,col):
     # Display the chart
     plt.show()
 
-# Create figure
-fig = go.Figure()
-fig.add_trace(go.Line(x=year_injury_fatalities.index, y=year_injury_fatalities['Injuries'], name='Injuries'))
-fig.add_trace(go.Line(x=year_injury_fatalities.index, y=year_injury_fatalities['Fatalities'], name='Fatalities'))
-# Update layout to add title and axis labels
-fig.update_layout(
-    title="Number of Injuries/Fatalities per year (2014–2024)",
-    xaxis_title="Year",
-    yaxis_title="Number of Injuries/Fatalities"
-)
+def casualties_line():
+    year_injury_fatalities = query_cube(cube, ['year'], ['Injuries','Fatalities'], county=counties_filter, cause=cause_filter).set_index('year')
+
+    # Create figure
+    fig = go.Figure()
+    fig.add_trace(go.Line(x=year_injury_fatalities.index, y=year_injury_fatalities['Injuries'], name='Injuries'))
+    fig.add_trace(go.Line(x=year_injury_fatalities.index, y=year_injury_fatalities['Fatalities'], name='Fatalities'))
+    # Update layout to add title and axis labels
+    fig.update_layout(
+        title="Number of Injuries/Fatalities per year (2014–2024)",
+        xaxis_title="Year",
+        yaxis_title="Number of Injuries/Fatalities"
+    )
+    return fig
 
-st.plotly_chart(fig)
+st.plotly_chart(plotly_figure('human_toll_line', (counties_filter, cause_filter), casualties_line))
 
 #Bar Chart: Fatalities and injuries by wildfire size.
-conditions = [
-    cal_fire['Area_Burned (Acres)']<15916,
-    (cal_fire['Area_Burned (Acres)']>=15916) & 
-    (cal_fire['Area_Burned (Acres)']<39775),
-    (cal_fire['Area_Burned (Acres)']>=39775)
-]
-choices = [
-    'Small',
-    'Medium',
-    'Large'
-]
-cal_fire['Area_Burned_cat'] = np.select(conditions, choices, default='unknown')
-burned_cat_fatel_inj = cal_fire[['Area_Burned_cat','Injuries','Fatalities']].groupby('Area_Burned_cat').sum()
-
-cat_order = ['Small','Medium','Large']
-# Convert the index to a categorical type with the custom order
-burned_cat_fatel_inj.index = pd.Categorical(burned_cat_fatel_inj.index, categories=cat_order, ordered=True)
-
-# Sort the DataFrame by the index
-burned_cat_fatel_inj_sorted = burned_cat_fatel_inj.sort_index()
-
-# Create figure
-fig = go.Figure()
-
-# Add traces
-fig.add_trace(go.Bar(x=burned_cat_fatel_inj_sorted.index, y=burned_cat_fatel_inj_sorted['Injuries'], name='Injuries'))
-fig.add_trace(go.Bar(x=burned_cat_fatel_inj_sorted.index, y=burned_cat_fatel_inj_sorted['Fatalities'], name='Fatalities'))
-# Update layout
-fig.update_layout(
-    barmode='group',  # Grouped bars
-    title='Fatalities and injuries by wildfire size',
-    xaxis_title='Wildfire size',
-    yaxis_title='Number of Injuries/Fatalities',
-    xaxis=dict(tickmode='linear')
-)
+def casualties_by_size_bar():
+    # Size buckets are computed from the whole dataset by preprocess.py
+    burned_cat_fatel_inj = group_incidents(['size_code'], ['Injuries','Fatalities'], county=counties_filter, cause=cause_filter)
+    burned_cat_fatel_inj = burned_cat_fatel_inj[burned_cat_fatel_inj['size_code'] >= 0]
+    burned_cat_fatel_inj_sorted = burned_cat_fatel_inj.set_axis(
+        pd.Categorical.from_codes(burned_cat_fatel_inj['size_code'], dtype=size_labels(DATA_PATH)))
+
+    # Create figure
+    fig = go.Figure()
+
+    # Add traces
+    fig.add_trace(go.Bar(x=burned_cat_fatel_inj_sorted.index, y=burned_cat_fatel_inj_sorted['Injuries'], name='Injuries'))
+    fig.add_trace(go.Bar(x=burned_cat_fatel_inj_sorted.index, y=burned_cat_fatel_inj_sorted['Fatalities'], name='Fatalities'))
+    # Update layout
+    fig.update_layout(
+        barmode='group',  # Grouped bars
+        title='Fatalities and injuries by wildfire size',
+        xaxis_title='Wildfire size',
+        yaxis_title='Number of Injuries/Fatalities',
+        xaxis=dict(tickmode='linear')
+    )
+    return fig
 
 # Show figure
-st.plotly_chart(fig)
+st.plotly_chart(plotly_figure('human_toll_size_bar', (counties_filter, cause_filter), casualties_by_size_bar))
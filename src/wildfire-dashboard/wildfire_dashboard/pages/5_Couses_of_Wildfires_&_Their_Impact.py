@@ -1,6 +1,10 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+from incidents import select_incidents
+from cube import load_cube, query_cube
+from figures import plotly_figure
+from distributions import box_stats, summarize
 
 
 st.markdown("""
@@ -21,9 +25,9 @@ This section of the dashboard provides insights into various factors that contri
 By filtering the data based on the years and location, users can explore how the causes and impacts of wildfires change over time and across different regions.
 """)
 
-cal_fire = pd.read_csv('src/wildfire-dashboard/wildfire_dashboard/wildfire_proc.csv')
+cube = load_cube()
 
-counties = list(cal_fire['county'].unique())
+counties = list(cube['county'].unique())
 counties.insert(0,'All')
 
 
@@ -36,37 +40,48 @@ counties_filter = st.selectbox(
 years_filter = st.slider("Select years", 2014, 2023, (2014, 2023))
 years_filter_list = list(range(years_filter[0],years_filter[1]))
 
-cal_fire = cal_fire[cal_fire['year'].isin(years_filter_list)]
-
-if counties_filter!='All':
-    cal_fire = cal_fire[cal_fire['county']==counties_filter]
-
 
 #Pie Chart: Percentage of wildfires by cause (Lightning, Human Activity, Unknown).
-fire_cause = cal_fire['Cause'].value_counts().reset_index()
-fire_cause['p'] = fire_cause['count']/fire_cause['count'].sum()
+def causes_pie():
+    fire_cause = query_cube(cube, ['Cause'], ['Incidents'], county=counties_filter, years=years_filter_list)
+    fire_cause['p'] = fire_cause['Incidents']/fire_cause['Incidents'].sum()
+
+    return px.pie(fire_cause, values='p', names='Cause', title='Percentage of wildfires by cause (Lightning, Human Activity, Unknown)')
 
-fig = px.pie(fire_cause, values='p', names='Cause', title='Percentage of wildfires by cause (Lightning, Human Activity, Unknown)')
-st.plotly_chart(fig)
+st.plotly_chart(plotly_figure('causes_pie', (counties_filter, years_filter), causes_pie))
 
 #Box Plot: Area burned by wildfire cause (which causes the most damage?).
-fig = px.box(cal_fire, x="Cause", y="Area_Burned (Acres)")
-fig.update_layout(
-    title='Area burned by wildfire cause',
-    xaxis_title='Wildfire Cause',
-    yaxis_title='Area Burned (Acres)'
-    )
-st.plotly_chart(fig)
+def area_burned_box():
+    cal_fire = select_incidents(['Cause', 'Area_Burned (Acres)'], county=counties_filter, years=years_filter_list)
+
+    if summarize(len(cal_fire)):
+        # Draw the boxes from their statistics instead of sending every incident to the browser
+        stats = box_stats(cal_fire["Cause"], cal_fire["Area_Burned (Acres)"])
+        fig = go.Figure(go.Box(x=stats['group'], q1=stats['q1'], median=stats['median'], q3=stats['q3'],
+                               lowerfence=stats['lowerfence'], upperfence=stats['upperfence'],
+                               mean=stats['mean'], boxpoints=False))
+    else:
+        fig = px.box(cal_fire, x="Cause", y="Area_Burned (Acres)")
+    fig.update_layout(
+        title='Area burned by wildfire cause',
+        xaxis_title='Wildfire Cause',
+        yaxis_title='Area Burned (Acres)'
+        )
+    return fig
+
+st.plotly_chart(plotly_figure('causes_area_box', (counties_filter, years_filter), area_burned_box))
 
 #Bar Chart: Financial losses by cause type.
-loss_couse = cal_fire[['Cause','Estimated_Financial_Loss (Billion $)']].groupby('Cause',as_index=False).sum()
-fig = px.bar(loss_couse, x='Cause', y='Estimated_Financial_Loss (Billion $)',text_auto='.2s')
-fig.update_traces(textfont_size=12, textangle=0, textposition="outside", cliponaxis=False)
-
-fig.update_layout(
-    title='Financial losses by cause type',
-    xaxis_title='Wildfire Cause',
-    yaxis_title='Estimated Financial Loss (Billion $)'
-    )
-
-st.plotly_chart(fig)
\ No newline at end of file
+def losses_bar():
+    loss_couse = query_cube(cube, ['Cause'], ['Estimated_Financial_Loss (Billion $)'], county=counties_filter, years=years_filter_list)
+    fig = px.bar(loss_couse, x='Cause', y='Estimated_Financial_Loss (Billion $)',text_auto='.2s')
+    fig.update_traces(textfont_size=12, textangle=0, textposition="outside", cliponaxis=False)
+
+    fig.update_layout(
+        title='Financial losses by cause type',
+        xaxis_title='Wildfire Cause',
+        yaxis_title='Estimated Financial Loss (Billion $)'
+        )
+    return fig
+
+st.plotly_chart(plotly_figure('causes_losses_bar', (counties_filter, years_filter), losses_bar))
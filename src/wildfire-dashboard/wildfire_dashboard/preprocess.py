@@ -0,0 +1,138 @@
+import argparse
+import os
+import shutil
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from wildfire_data import DATA_PATH
+from cube import CUBE_PATH, DIMENSIONS, build_cube
+from counties import county_codes
+from sizes import (AREA_COL, SIZE_LABELS, SIZE_QUANTILES, bucket_shares, make_buckets, read_buckets, size_codes,
+                   target_shares, write_buckets)
+
+RAW_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'California_Wildfire_Damage.csv')
+CHUNK_SIZE = 100_000
+MAX_DRIFT = 0.05  # Largest change of a size bucket's share of the incidents before the buckets are recomputed
+
+
+def process(cal_fire):
+    """Cleans a batch of raw incidents (same steps as the former preprocess.ipynb)."""
+    cal_fire = cal_fire.copy()
+    # Ensure the column is in datetime format
+    cal_fire['Date'] = pd.to_datetime(cal_fire['Date'], errors='coerce')
+    # Extract year and month into separate columns for trend analysis
+    cal_fire['year'] = cal_fire['Date'].dt.year.astype('Int16')
+    cal_fire['month'] = cal_fire['Date'].dt.month_name()
+    cal_fire['county'] = cal_fire['Location'].str.replace(' County','')
+    # Integer key into the county reference index (-1 for names it does not know)
+    cal_fire['county_code'] = county_codes(cal_fire['county'])
+    # Most wildfires are above 1B, convert the loss to billions for readability
+    cal_fire['Estimated_Financial_Loss (Billion $)'] = round(cal_fire['Estimated_Financial_Loss (Million $)']*.001,2)
+    return cal_fire
+
+
+def dataset_column(out_path, column):
+    """A column of the processed dataset (only that column is read)."""
+    if not os.path.isdir(out_path):
+        return pd.Series([], dtype=object)
+    return ds.dataset(out_path, format='parquet').to_table(columns=[column])[column].to_pandas()
+
+
+def processed_ids(out_path):
+    """Incident_IDs already in the processed dataset."""
+    return pd.Index(dataset_column(out_path, 'Incident_ID'))
+
+
+def write_part(df, out_path):
+    # Hidden while being written, so readers never see a partial file
+    os.makedirs(out_path, exist_ok=True)
+    name = f'part-{pd.Timestamp.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet'
+    tmp_path = os.path.join(out_path, f'.{name}')
+    df.to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+    os.replace(tmp_path, os.path.join(out_path, name))
+
+
+def recode_sizes(out_path, boundaries):
+    # Rewrites the size_code column of every published file with new boundaries
+    for name in sorted(os.listdir(out_path)):
+        if name.startswith('part-') and name.endswith('.parquet'):
+            df = pd.read_parquet(os.path.join(out_path, name))
+            df['size_code'] = size_codes(df[AREA_COL], boundaries)
+            tmp_path = os.path.join(out_path, f'.{name}')
+            df.to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+            os.replace(tmp_path, os.path.join(out_path, name))
+
+
+def update_sizes(new_rows, out_path, quantiles=SIZE_QUANTILES, labels=SIZE_LABELS, max_drift=MAX_DRIFT):
+    """Codes the size bucket of the new rows, recomputing the buckets from every incident when needed.
+
+    The buckets are recomputed when there are none yet, when the quantiles or labels change, or
+    when a bucket's share of the incidents moved more than max_drift away from its quantile range.
+    Returns the buckets and whether the published files must be recoded with them.
+    """
+    area = np.concatenate([dataset_column(out_path, AREA_COL).to_numpy(float), new_rows[AREA_COL].to_numpy(float)])
+    buckets = read_buckets(out_path)
+    if (buckets is None or buckets['quantiles'] != list(quantiles) or buckets['labels'] != list(labels)
+            or np.abs(bucket_shares(size_codes(area, buckets['boundaries']), buckets) - target_shares(buckets)).max() > max_drift):
+        buckets, recode = make_buckets(area, quantiles, labels), True
+    else:
+        recode = False
+    new_rows['size_code'] = size_codes(new_rows[AREA_COL], buckets['boundaries'])
+    return buckets, recode
+
+
+def update_cube(new_rows, cube_path):
+    # Cube cells are sums, so the cube of the new rows is added to the existing one
+    cube = build_cube(new_rows)
+    if os.path.exists(cube_path):
+        cube = pd.concat([pd.read_parquet(cube_path), cube]).groupby(DIMENSIONS, observed=True).sum().reset_index()
+    cube.to_parquet(cube_path + '.tmp', engine='pyarrow', index=False)
+    os.replace(cube_path + '.tmp', cube_path)
+
+
+def preprocess(raw_path=RAW_PATH, out_path=DATA_PATH, cube_path=CUBE_PATH, full=False, chunk_size=CHUNK_SIZE,
+               size_quantiles=SIZE_QUANTILES, size_labels=SIZE_LABELS, max_drift=MAX_DRIFT):
+    """Processes the raw incidents not yet in out_path and appends them as a new Parquet file.
+
+    Returns the number of new incidents.
+    """
+    if full:
+        shutil.rmtree(out_path, ignore_errors=True)
+        if os.path.exists(cube_path):
+            os.remove(cube_path)
+    seen = processed_ids(out_path)
+    new_rows = []
+    for chunk in pd.read_csv(raw_path, chunksize=chunk_size):
+        chunk = chunk[~chunk['Incident_ID'].isin(seen)]
+        if len(chunk):
+            new_rows.append(process(chunk))
+    if not new_rows:
+        return 0
+    new_rows = pd.concat(new_rows, ignore_index=True).drop_duplicates('Incident_ID')
+    buckets, recode = update_sizes(new_rows, out_path, size_quantiles, size_labels, max_drift)
+    if recode and os.path.isdir(out_path):
+        recode_sizes(out_path, buckets['boundaries'])
+    write_part(new_rows, out_path)
+    write_buckets(buckets, out_path)
+    update_cube(new_rows, cube_path)
+    return len(new_rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process new raw wildfire incidents into the dashboard's Parquet dataset.")
+    parser.add_argument("--raw", type=str, default=RAW_PATH, help="Raw incidents CSV (default is California_Wildfire_Damage.csv)")
+    parser.add_argument("--out", type=str, default=DATA_PATH, help="Processed Parquet dataset directory")
+    parser.add_argument("--cube", type=str, default=CUBE_PATH, help="Aggregation cube Parquet file")
+    parser.add_argument("--full", action="store_true", help="Reprocess every incident instead of only the new ones")
+    parser.add_argument("--chunk_size", type=int, default=CHUNK_SIZE, help=f"Raw rows read at a time (default is {CHUNK_SIZE})")
+    parser.add_argument("--size_quantiles", type=float, nargs='+', default=SIZE_QUANTILES,
+                        help=f"Area burned quantiles splitting the size buckets (default is {' '.join(map(str, SIZE_QUANTILES))})")
+    parser.add_argument("--size_labels", type=str, nargs='+', default=SIZE_LABELS,
+                        help=f"Size bucket names, one more than the quantiles (default is {' '.join(SIZE_LABELS)})")
+    parser.add_argument("--max_drift", type=float, default=MAX_DRIFT,
+                        help=f"Change of a bucket's share of the incidents that triggers recomputing the buckets (default is {MAX_DRIFT})")
+    args = parser.parse_args()
+    added = preprocess(args.raw, args.out, args.cube, args.full, args.chunk_size,
+                       args.size_quantiles, args.size_labels, args.max_drift)
+    print(f'{added} new incidents processed')
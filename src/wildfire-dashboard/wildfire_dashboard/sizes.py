@@ -0,0 +1,63 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Wildfire size buckets by area burned, split at quantiles of the whole dataset
+# (the quartiles reproduce the former hard-coded 15916 and 39775 acres thresholds)
+SIZE_QUANTILES = [0.25, 0.75]
+SIZE_LABELS = ['Small', 'Medium', 'Large']
+AREA_COL = 'Area_Burned (Acres)'
+# Kept next to the Parquet files, names starting with _ are skipped by the Parquet readers
+BUCKETS_FILE = '_size_buckets.json'
+
+
+def size_boundaries(area, quantiles=SIZE_QUANTILES):
+    """Area burned at the given quantiles of the incidents."""
+    area = np.asarray(area, dtype=float)
+    return np.quantile(area[~np.isnan(area)], quantiles).tolist()
+
+
+def size_codes(area, boundaries):
+    """int8 bucket of each area, i.e. the number of boundaries it reaches (-1 for a missing area)."""
+    area = np.asarray(area, dtype=float)
+    codes = np.searchsorted(boundaries, area, side='right').astype(np.int8)
+    codes[np.isnan(area)] = -1
+    return codes
+
+
+def bucket_shares(codes, buckets):
+    return np.bincount(codes[codes >= 0], minlength=len(buckets['labels'])) / max((codes >= 0).sum(), 1)
+
+
+def target_shares(buckets):
+    return np.diff([0] + list(buckets['quantiles']) + [1])
+
+
+def make_buckets(area, quantiles=SIZE_QUANTILES, labels=SIZE_LABELS):
+    if len(labels) != len(quantiles) + 1:
+        raise ValueError(f'{len(quantiles)} quantiles need {len(quantiles) + 1} labels, got {labels}')
+    return {'quantiles': list(quantiles), 'boundaries': size_boundaries(area, quantiles), 'labels': list(labels)}
+
+
+def read_buckets(data_path):
+    """Size buckets the dataset was coded with, None if it has none yet."""
+    path = os.path.join(data_path, BUCKETS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_buckets(buckets, data_path):
+    path = os.path.join(data_path, BUCKETS_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(buckets, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def size_labels(data_path):
+    """Ordered categorical dtype of the size labels, indexed by size_code."""
+    buckets = read_buckets(data_path)
+    labels = buckets['labels'] if buckets else SIZE_LABELS
+    return pd.CategoricalDtype(labels, ordered=True)
@@ -0,0 +1,57 @@
+import os
+import pandas as pd
+import streamlit as st
+from counties import county_codes
+from sizes import AREA_COL, make_buckets, read_buckets, size_codes
+
+# Parquet dataset written by preprocess.py, one file per batch of new incidents
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wildfire_proc')
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+
+
+def data_version(path=DATA_PATH):
+    """Modification time of the processed dataset, used to invalidate everything cached on top of it.
+
+    Adding a file to the dataset directory updates the directory's modification time.
+    """
+    return os.path.getmtime(path)
+
+
+def set_dtypes(cal_fire):
+    """Casts the columns of the incidents (or of a selection of them) to their dashboard dtypes."""
+    categories = {c: 'category' for c in ['county', 'Cause', 'Location'] if c in cal_fire}
+    cal_fire = cal_fire.astype(categories)
+    if 'month' in cal_fire:
+        cal_fire['month'] = pd.Categorical(cal_fire['month'], categories=MONTHS, ordered=True)
+    return cal_fire
+
+
+def read_data(path=DATA_PATH):
+    """Reads the processed incidents with their dashboard dtypes (uncached)."""
+    cal_fire = pd.read_parquet(path)
+    if 'county_code' not in cal_fire:
+        # Datasets processed before the county index existed
+        cal_fire['county_code'] = county_codes(cal_fire['county'])
+    if 'size_code' not in cal_fire:
+        # Datasets processed before the size buckets existed
+        buckets = read_buckets(path) or make_buckets(cal_fire[AREA_COL])
+        cal_fire['size_code'] = size_codes(cal_fire[AREA_COL], buckets['boundaries'])
+    return set_dtypes(cal_fire)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load(path, version):
+    return read_data(path)
+
+
+def load_data(path=DATA_PATH):
+    """Returns the processed wildfire incidents.
+
+    The frame is loaded once per process and shared by all sessions and pages (do not modify it
+    in place); it is reloaded when the file's modification time changes.
+    """
+    return _load(path, data_version(path))